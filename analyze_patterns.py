@@ -3,24 +3,349 @@ Pattern Analysis Tool - Simulates Feedback Triage and Issue Identification
 Demonstrates ability to identify patterns in LLM quality issues and prioritize them
 """
 
-import pandas as pd
+import argparse
+import json
 import os
+import time
 from collections import Counter
-import matplotlib.pyplot as plt
+from fractions import Fraction
+from results_io import file_hash, read_results
+from rubrics import (
+    ISSUE_INAPPROPRIATE, ISSUE_MISSING_CONCEPTS, ISSUE_NOTES, ISSUE_SAFETY, NO_ISSUES_NOTE, RUBRIC_INDEX,
+    RUBRICS_BY_CODE, TOPIC_CODE_SHIFT, match_rubric,
+)
+from quality_sketch import (
+    histogram_merge, histogram_update, new_histogram, new_sketch, sketch_merge, sketch_percentiles, sketch_update,
+)
+from profiling import new_profile, profile_path, profile_stage, report_profile
+from render_dashboards import finish_render, render
+from run_registry import RESULTS_DIR, connect_registry, latest_run, list_runs
+
+# pandas and matplotlib are only imported when a results file has to be summarized
+# or a dashboard drawn, so cached analyses start instantly
+
+# Everything the analysis reads - the full Response text is never needed
+ANALYSIS_COLUMNS = [
+    'Test_ID', 'Prompt', 'Grade_Level', 'Expected_Quality',
+    'Educational_Quality', 'Overall_Rating', 'Matches_Expected', 'Notes', 'Issue_Codes', 'Cluster_ID'
+]
+
+# Per-results-file aggregates are cached here, one JSON file per results file hash
+SUMMARY_CACHE_DIR = os.path.join(RESULTS_DIR, 'summaries')
+SUMMARY_VERSION = 5
+
+RATINGS = ['Poor', 'Needs Review', 'Good', 'Excellent']
+QUALITY_BUCKETS = ['< 0.3', '0.3-0.5', '0.5-0.7', '0.7-0.9', '>= 0.9']
+EXAMPLE_ROWS = 5
+# Prompts with the most near-duplicate responses kept per summary
+TOP_DUPLICATE_PROMPTS = 10
+# Topic of prompts that match no rubric
+OTHER_TOPIC = 'other'
 
 def find_latest_results():
-    """Find the most recent results file"""
-    results_dir = 'results'
-    if not os.path.exists(results_dir):
-        return None
-    results_files = [f for f in os.listdir(results_dir) if f.startswith('results_') and f.endswith('.csv')]
-    if not results_files:
+    """Find the most recent results file (from the run registry)"""
+    if not os.path.exists(RESULTS_DIR):
         return None
-    # Sort by number in filename
-    results_files.sort(key=lambda x: int(x.split('_')[1].split('.')[0]), reverse=True)
-    return os.path.join(results_dir, results_files[0])
+    run = latest_run(connect_registry())
+    return run['results_path'] if run else None
+
+def empty_summary():
+    """Aggregates for zero rows - the identity for merge_summaries"""
+    return {
+        'version': SUMMARY_VERSION,
+        'sources': [],
+        'total': 0,
+        'ratings': {rating: 0 for rating in RATINGS},
+        'note_counts': {},
+        'note_first': {},
+        'grades': {},
+        'quality_sum': 0.0,
+        'quality_exact_sum': '0',
+        'quality_count': 0,
+        'quality_buckets': [0] * len(QUALITY_BUCKETS),
+        'quality_histogram': new_histogram(),
+        'quality_sketch': new_sketch(),
+        'grade_sketches': {},
+        'topic_sketches': {},
+        'matches': 0,
+        'safety_flags': 0,
+        'safety_issues': 0,
+        'low_quality': {'count': 0, 'examples': []},
+        'mismatches': {'count': 0, 'examples': []},
+        # Only results evaluated with --dedupe have clusters; rows counts those results' rows
+        'duplicates': {'rows': 0, 'clusters': 0, 'prompts': {}},
+    }
+
+def count_issue_codes(codes):
+    """
+    Count notes straight from the Issue_Codes bitmask column with integer bit operations
+    Returns (note_counts, inappropriate_language_count, first appearances); notes are
+    ordered by the row and position where each first appears, as counting the Notes text
+    would order them, and first appearances map each note to that [row, position]
+    """
+    import numpy as np
+    
+    found = []
+    for position, (bit, note) in enumerate(ISSUE_NOTES.items()):
+        rows = np.flatnonzero(codes & bit)
+        if len(rows):
+            found.append((rows[0], position, note, len(rows)))
+    
+    missed_rows = np.flatnonzero(codes & ISSUE_MISSING_CONCEPTS)
+    topics, first, counts = np.unique(codes[missed_rows] >> TOPIC_CODE_SHIFT, return_index=True, return_counts=True)
+    for topic, first_index, count in zip(topics, first, counts):
+        found.append((missed_rows[first_index], len(ISSUE_NOTES), RUBRICS_BY_CODE[int(topic)]['note'], count))
+    
+    clean_rows = np.flatnonzero(codes == 0)
+    if len(clean_rows):
+        found.append((clean_rows[0], 0, NO_ISSUES_NOTE, len(clean_rows)))
+    
+    note_counts = {}
+    note_first = {}
+    for row, position, note, count in sorted(found, key=lambda item: (item[0], item[1])):
+        note_counts[note] = note_counts.get(note, 0) + int(count)
+        note_first.setdefault(note, [int(row), position])
+    return note_counts, int(np.count_nonzero(codes & ISSUE_INAPPROPRIATE)), note_first
+
+def exact_sum(values, counts):
+    """Exact sum of each value times its count, as a Fraction"""
+    return sum((Fraction(float(value)) * int(count) for value, count in zip(values, counts) if count), Fraction(0))
+
+def prompt_topic(prompt):
+    """Topic of the rubric a prompt is scored against, as evaluate_response picks it"""
+    rubric = match_rubric(str(prompt).lower(), RUBRIC_INDEX)
+    return rubric['topic'] if rubric else OTHER_TOPIC
+
+def group_sketches(codes, labels, quality):
+    """A quantile sketch of the quality scores of each group, from every row's group code"""
+    import numpy as np
+    
+    grouped = (codes >= 0) & ~np.isnan(quality)
+    # 16-bit codes (there are rarely many groups) let the stable sort run as a radix sort
+    codes = codes.astype(np.int16 if len(labels) < 2 ** 15 else np.int64)
+    order = np.argsort(codes[grouped], kind='stable')
+    values = quality[grouped][order]
+    bounds = np.searchsorted(codes[grouped][order], np.arange(len(labels) + 1))
+    return {
+        str(label): sketch_update(new_sketch(), values[start:end])
+        for label, start, end in zip(labels, bounds[:-1], bounds[1:]) if end > start
+    }
+
+def summarize_results(df, source=None):
+    """
+    Reduce a results frame to the compact aggregates every report reads
+    Each column is categorized once (quality into threshold buckets, notes into their
+    distinct strings) instead of building a separate boolean mask per statistic
+    """
+    import numpy as np
+    import pandas as pd
+    
+    summary = empty_summary()
+    summary['sources'] = [source] if source else []
+    summary['total'] = len(df)
+    
+    rating_counts = df['Overall_Rating'].value_counts()
+    for rating in RATINGS:
+        summary['ratings'][rating] = int(rating_counts.get(rating, 0))
+    
+    if 'Issue_Codes' in df.columns:
+        codes = df['Issue_Codes'].to_numpy(dtype=np.int64)
+        summary['note_counts'], summary['safety_flags'], note_first = count_issue_codes(codes)
+        summary['safety_issues'] = int(np.count_nonzero(codes & ISSUE_SAFETY))
+    else:
+        # Results written before Issue_Codes existed: fall back to parsing the Notes text.
+        # Notes repeat heavily, so split and scan each distinct string once, weighted by its count.
+        # Distinct strings are taken in order of first appearance, which keeps Counter tie order
+        note_codes, note_strings = pd.factorize(df['Notes'])
+        note_weights = np.bincount(note_codes[note_codes >= 0], minlength=len(note_strings))
+        seen_codes, first_rows = np.unique(note_codes, return_index=True)
+        first_rows = first_rows[seen_codes >= 0]
+        note_counts = Counter()
+        note_first = {}
+        for notes, weight, row in zip(note_strings, note_weights, first_rows):
+            if isinstance(notes, str) and notes:
+                for position, note in enumerate(notes.split(';')):
+                    note_counts[note.strip()] += int(weight)
+                    note_first.setdefault(note.strip(), [int(row), position])
+                if 'inappropriate language' in notes.lower():
+                    summary['safety_flags'] += int(weight)
+                if ISSUE_NOTES[ISSUE_SAFETY] in notes:
+                    summary['safety_issues'] += int(weight)
+        summary['note_counts'] = dict(note_counts)
+    
+    # First appearances as [Test_ID, position], so shards of one run can be merged in row order
+    test_ids = df['Test_ID'].to_numpy()
+    summary['note_first'] = {note: [int(test_ids[row]), position] for note, (row, position) in note_first.items()}
+    
+    # Quality sums are also kept exactly, as fractions, so summaries merged from shards
+    # report the same means as one summary of all the rows, whatever the float rounding
+    grade_codes, grade_labels = pd.factorize(df['Grade_Level'])
+    value_codes, values = pd.factorize(df['Educational_Quality'])
+    scored_rows = value_codes >= 0
+    summary['quality_exact_sum'] = str(exact_sum(values, np.bincount(value_codes[scored_rows], minlength=len(values))))
+    graded = scored_rows & (grade_codes >= 0)
+    value_counts = np.bincount(grade_codes[graded] * len(values) + value_codes[graded],
+                               minlength=len(grade_labels) * len(values)).reshape(len(grade_labels), len(values))
+    grade_sums = {str(grade): exact_sum(values, counts) for grade, counts in zip(grade_labels, value_counts)}
+    
+    grade_stats = df.groupby('Grade_Level', observed=True)['Educational_Quality'].agg(['min', 'max', 'count'])
+    for grade, stats in grade_stats.iterrows():
+        total = grade_sums[str(grade)]
+        summary['grades'][str(grade)] = {
+            'sum': float(total),
+            'exact_sum': str(total),
+            'min': float(stats['min']),
+            'max': float(stats['max']),
+            'count': int(stats['count']),
+        }
+    
+    # Bucket every score once against the 0.3 / 0.5 / 0.7 / 0.9 thresholds
+    quality = df['Educational_Quality'].to_numpy(dtype=float)
+    scored = ~np.isnan(quality)
+    buckets = np.digitize(quality[scored], [0.3, 0.5, 0.7, 0.9])
+    summary['quality_buckets'] = [int(n) for n in np.bincount(buckets, minlength=len(QUALITY_BUCKETS))]
+    summary['quality_sum'] = float(Fraction(summary['quality_exact_sum']))
+    summary['quality_count'] = int(scored.sum())
+    
+    # Mergeable distribution summaries for percentiles: a histogram and a quantile sketch
+    # of every score, and a sketch per grade level and per topic (taken once per distinct prompt)
+    summary['quality_histogram'] = histogram_update(new_histogram(), quality)
+    summary['quality_sketch'] = sketch_update(new_sketch(), quality)
+    # In grade order, like summary['grades'] and merged summaries
+    summary['grade_sketches'] = dict(sorted(group_sketches(grade_codes, grade_labels, quality).items()))
+    prompt_codes, prompts = pd.factorize(df['Prompt'])
+    topic_of_prompt, topics = pd.factorize(pd.Series([prompt_topic(prompt) for prompt in prompts], dtype=object))
+    topic_codes = np.where(prompt_codes >= 0, topic_of_prompt[prompt_codes], -1)
+    summary['topic_sketches'] = group_sketches(topic_codes, topics, quality)
+    
+    matched = df['Matches_Expected'].to_numpy(dtype=bool)
+    summary['matches'] = int(matched.sum())
+    
+    # Low performers are the three buckets below 0.7
+    low = np.zeros(len(df), dtype=bool)
+    low[scored] = buckets < 3
+    summary['low_quality'] = {
+        'count': int(low.sum()),
+        'examples': [
+            {'Test_ID': int(row['Test_ID']), 'Prompt': str(row['Prompt'])[:60],
+             'Educational_Quality': float(row['Educational_Quality'])}
+            for _, row in df[low].head(EXAMPLE_ROWS).iterrows()
+        ],
+    }
+    summary['mismatches'] = {
+        'count': int((~matched).sum()),
+        'examples': [
+            {'Test_ID': int(row['Test_ID']), 'Prompt': str(row['Prompt'])[:60],
+             'Expected_Quality': str(row['Expected_Quality']), 'Overall_Rating': str(row['Overall_Rating'])}
+            for _, row in df[~matched].head(EXAMPLE_ROWS).iterrows()
+        ],
+    }
+    
+    if 'Cluster_ID' in df.columns:
+        # Every row past the first of its cluster is a near-duplicate
+        cluster_ids = df['Cluster_ID'].to_numpy(dtype=np.int64)
+        duplicate = pd.Series(cluster_ids).duplicated().to_numpy()
+        per_prompt = df.loc[duplicate, 'Prompt'].astype(str).value_counts().head(TOP_DUPLICATE_PROMPTS)
+        summary['duplicates'] = {
+            'rows': len(df),
+            'clusters': int(len(df) - duplicate.sum()),
+            'prompts': {prompt: int(count) for prompt, count in per_prompt.items()},
+        }
+    return summary
+
+def merge_summaries(summaries, shards=False):
+    """
+    Combine per-run summaries into one, as if their rows had been analyzed together
+    With shards, the summaries cover disjoint rows of one run (see shards.py), so notes and
+    examples are put back in Test_ID order, as a summary of the whole run would have them
+    """
+    merged = empty_summary()
+    note_counts = Counter()
+    duplicate_prompts = Counter()
+    for summary in summaries:
+        merged['sources'].extend(summary['sources'])
+        merged['total'] += summary['total']
+        for rating in RATINGS:
+            merged['ratings'][rating] += summary['ratings'][rating]
+        note_counts.update(summary['note_counts'])
+        if shards:
+            for note, first in summary['note_first'].items():
+                merged['note_first'][note] = min(merged['note_first'].get(note, first), first)
+        for grade, stats in summary['grades'].items():
+            combined = merged['grades'].get(grade)
+            if combined is None:
+                merged['grades'][grade] = dict(stats)
+            else:
+                total = Fraction(combined['exact_sum']) + Fraction(stats['exact_sum'])
+                combined['sum'] = float(total)
+                combined['exact_sum'] = str(total)
+                combined['min'] = min(combined['min'], stats['min'])
+                combined['max'] = max(combined['max'], stats['max'])
+                combined['count'] += stats['count']
+        quality_total = Fraction(merged['quality_exact_sum']) + Fraction(summary['quality_exact_sum'])
+        merged['quality_sum'] = float(quality_total)
+        merged['quality_exact_sum'] = str(quality_total)
+        merged['quality_count'] += summary['quality_count']
+        merged['quality_buckets'] = [a + b for a, b in zip(merged['quality_buckets'], summary['quality_buckets'])]
+        merged['matches'] += summary['matches']
+        merged['safety_flags'] += summary['safety_flags']
+        merged['safety_issues'] += summary['safety_issues']
+        histogram_merge(merged['quality_histogram'], summary['quality_histogram'])
+        sketch_merge(merged['quality_sketch'], summary['quality_sketch'])
+        for key in ['grade_sketches', 'topic_sketches']:
+            for label, sketch in summary[key].items():
+                sketch_merge(merged[key].setdefault(label, new_sketch(sketch['k'])), sketch)
+        for key in ['low_quality', 'mismatches']:
+            merged[key]['count'] += summary[key]['count']
+            examples = merged[key]['examples'] + summary[key]['examples']
+            if shards:
+                examples.sort(key=lambda row: row['Test_ID'])
+            merged[key]['examples'] = examples[:EXAMPLE_ROWS]
+        # Cluster IDs are Test_IDs within one run, so clusters never span runs
+        merged['duplicates']['rows'] += summary['duplicates']['rows']
+        merged['duplicates']['clusters'] += summary['duplicates']['clusters']
+        duplicate_prompts.update(summary['duplicates']['prompts'])
+    merged['duplicates']['prompts'] = dict(duplicate_prompts.most_common(TOP_DUPLICATE_PROMPTS))
+    merged['note_counts'] = dict(note_counts)
+    if shards:
+        # Most-common ties are broken by first appearance, so keep the whole run's note order
+        merged['note_counts'] = {note: note_counts[note] for note in sorted(note_counts, key=merged['note_first'].get)}
+    merged['grades'] = dict(sorted(merged['grades'].items()))
+    merged['grade_sketches'] = dict(sorted(merged['grade_sketches'].items()))
+    return merged
 
-def analyze_quality_patterns(df):
+def load_summary(results_file, cache_dir=SUMMARY_CACHE_DIR, profile=None):
+    """
+    Aggregates for one results file, computed once per file content and cached
+    Unchanged files are answered from the cache without reading any rows
+    """
+    with profile_stage(profile, 'summary cache'):
+        cache_path = os.path.join(cache_dir, f'{file_hash(results_file)}.json')
+        summary = None
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                summary = json.load(f)
+    if summary is not None and summary.get('version') == SUMMARY_VERSION:
+        summary['sources'] = [results_file]
+        return summary
+    
+    # Older results files have no Issue_Codes column, so only ask for columns that exist
+    with profile_stage(profile, 'read'):
+        df = read_results(results_file, lambda name: name in ANALYSIS_COLUMNS)
+    with profile_stage(profile, 'summarize'):
+        summary = summarize_results(df, results_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(summary, f)
+    os.replace(temp_path, cache_path)
+    return summary
+
+def percentile_text(sketch):
+    """p50 / p90 / p99 of a quality sketch, and how many scores it has seen"""
+    return ' / '.join(f"{value:.2f}" for value in sketch_percentiles(sketch).values()) + f" (n={sketch['n']})"
+
+def analyze_quality_patterns(summary):
     """Identify common quality issues and patterns"""
     
     print("=" * 70)
@@ -28,26 +353,13 @@ def analyze_quality_patterns(df):
     print("=" * 70)
     
     # Identify issues by rating
-    issues = {
-        'Poor': df[df['Overall_Rating'] == 'Poor'],
-        'Needs Review': df[df['Overall_Rating'] == 'Needs Review'],
-        'Good': df[df['Overall_Rating'] == 'Good'],
-        'Excellent': df[df['Overall_Rating'] == 'Excellent']
-    }
-    
     print(f"\n📊 Quality Distribution:")
-    for rating, data in issues.items():
-        count = len(data)
-        percentage = (count / len(df)) * 100
+    for rating, count in summary['ratings'].items():
+        percentage = (count / summary['total']) * 100
         print(f"  {rating}: {count} ({percentage:.1f}%)")
     
-    # Analyze notes for common issues
-    all_notes = []
-    for notes in df['Notes']:
-        if isinstance(notes, str) and notes:
-            all_notes.extend([n.strip() for n in notes.split(';')])
-    
-    note_counts = Counter(all_notes)
+    # Common issues from the notes
+    note_counts = Counter(summary['note_counts'])
     
     if note_counts:
         print(f"\n🔍 Common Issues Identified:")
@@ -56,32 +368,46 @@ def analyze_quality_patterns(df):
     
     # Grade level analysis
     print(f"\n📚 Grade Level Performance:")
-    grade_performance = df.groupby('Grade_Level').agg({
-        'Educational_Quality': ['mean', 'min', 'max', 'count']
-    }).round(2)
-    
-    for grade in grade_performance.index:
-        stats = grade_performance.loc[grade]['Educational_Quality']
-        print(f"  {grade}: Avg={stats['mean']:.2f}, Min={stats['min']:.2f}, Max={stats['max']:.2f} (n={int(stats['count'])})")
+    for grade, stats in summary['grades'].items():
+        # Round the way pandas does (rint of the scaled value), as the report always has
+        mean = round(float(Fraction(stats['exact_sum']) / stats['count']) * 100) / 100
+        print(f"  {grade}: Avg={mean:.2f}, Min={stats['min']:.2f}, Max={stats['max']:.2f} (n={stats['count']})")
+    
+    # Percentiles are read from the quality sketches, so they cost the same for any number of rows or runs
+    if summary['quality_sketch']['n']:
+        print(f"\n📐 Quality Percentiles (p50 / p90 / p99):")
+        print(f"  All responses: {percentile_text(summary['quality_sketch'])}")
+        for grade, sketch in summary['grade_sketches'].items():
+            print(f"  {grade}: {percentile_text(sketch)}")
+        print(f"\n🧪 Quality Percentiles by Topic (p50 / p90 / p99):")
+        for topic, sketch in sorted(summary['topic_sketches'].items(), key=lambda item: (-item[1]['n'], item[0])):
+            print(f"  {topic}: {percentile_text(sketch)}")
     
     # Low performers (Educational Quality < 0.7)
-    low_performers = df[df['Educational_Quality'] < 0.7]
-    if len(low_performers) > 0:
-        print(f"\n⚠️  Low Quality Responses ({len(low_performers)} found):")
-        for idx, row in low_performers.head(5).iterrows():
+    low_performers = summary['low_quality']
+    if low_performers['count'] > 0:
+        print(f"\n⚠️  Low Quality Responses ({low_performers['count']} found):")
+        for row in low_performers['examples']:
             print(f"  Test #{row['Test_ID']}: {row['Prompt'][:50]}... (Score: {row['Educational_Quality']:.2f})")
     
+    # Near-duplicate responses (results evaluated with --dedupe)
+    duplicates = summary['duplicates']
+    if duplicates['rows'] > 0:
+        repeated = duplicates['rows'] - duplicates['clusters']
+        print(f"\n🧬 Near-Duplicate Responses: {repeated} of {duplicates['rows']} "
+              f"({repeated / duplicates['rows'] * 100:.1f}%) in {duplicates['clusters']} clusters")
+        for prompt, count in list(duplicates['prompts'].items())[:EXAMPLE_ROWS]:
+            print(f"  • {prompt[:50]}...: {count} duplicates")
+    
     # Mismatches between expected and actual
-    mismatches = df[~df['Matches_Expected']]
-    if len(mismatches) > 0:
-        print(f"\n🎯 Evaluator Mismatches ({len(mismatches)} found):")
-        for idx, row in mismatches.head(5).iterrows():
+    mismatches = summary['mismatches']
+    if mismatches['count'] > 0:
+        print(f"\n🎯 Evaluator Mismatches ({mismatches['count']} found):")
+        for row in mismatches['examples']:
             print(f"  Test #{row['Test_ID']}: Expected '{row['Expected_Quality']}' but got '{row['Overall_Rating']}'")
             print(f"    Prompt: {row['Prompt'][:60]}...")
-    
-    return issues, low_performers, mismatches
 
-def prioritize_issues(df, low_performers, mismatches):
+def prioritize_issues(summary):
     """Create a prioritized list of issues to address"""
     
     print("\n" + "=" * 70)
@@ -91,43 +417,42 @@ def prioritize_issues(df, low_performers, mismatches):
     priority_queue = []
     
     # High Priority: Safety issues
-    safety_issues = df[df['Notes'].str.contains('inappropriate language', case=False, na=False)]
-    if len(safety_issues) > 0:
+    if summary['safety_flags'] > 0:
         priority_queue.append({
             'priority': 'HIGH',
             'category': 'Safety',
-            'count': len(safety_issues),
+            'count': summary['safety_flags'],
             'description': 'Inappropriate language detected',
             'action': 'Immediate review and content filter adjustment needed'
         })
     
     # High Priority: Large evaluator mismatches
-    if len(mismatches) > 5:
+    mismatches = summary['mismatches']['count']
+    if mismatches > 5:
         priority_queue.append({
             'priority': 'HIGH',
             'category': 'Evaluator Accuracy',
-            'count': len(mismatches),
-            'description': f'Evaluator accuracy is {(1 - len(mismatches)/len(df))*100:.1f}%',
+            'count': mismatches,
+            'description': f'Evaluator accuracy is {(1 - mismatches/summary["total"])*100:.1f}%',
             'action': 'Recalibrate evaluation rubrics and scoring thresholds'
         })
     
     # Medium Priority: Low quality responses
-    if len(low_performers) > 0:
+    if summary['low_quality']['count'] > 0:
         priority_queue.append({
             'priority': 'MEDIUM',
             'category': 'Response Quality',
-            'count': len(low_performers),
+            'count': summary['low_quality']['count'],
             'description': 'Responses with Educational Quality < 0.7',
             'action': 'Review LLM prompts and fine-tuning needs'
         })
     
     # Low Priority: Minor improvements
-    good_responses = df[df['Overall_Rating'] == 'Good']
-    if len(good_responses) > 0:
+    if summary['ratings']['Good'] > 0:
         priority_queue.append({
             'priority': 'LOW',
             'category': 'Optimization',
-            'count': len(good_responses),
+            'count': summary['ratings']['Good'],
             'description': 'Good responses that could be elevated to Excellent',
             'action': 'Analyze for enhancement opportunities'
         })
@@ -143,21 +468,21 @@ def prioritize_issues(df, low_performers, mismatches):
     
     return priority_queue
 
-def generate_summary_report(df, filename):
+def generate_summary_report(summary, filename):
     """Generate executive summary"""
     
     print("=" * 70)
     print("EXECUTIVE SUMMARY")
     print("=" * 70)
     
-    total = len(df)
-    excellent = len(df[df['Overall_Rating'] == 'Excellent'])
-    good = len(df[df['Overall_Rating'] == 'Good'])
-    needs_review = len(df[df['Overall_Rating'] == 'Needs Review'])
-    poor = len(df[df['Overall_Rating'] == 'Poor'])
+    total = summary['total']
+    excellent = summary['ratings']['Excellent']
+    good = summary['ratings']['Good']
+    needs_review = summary['ratings']['Needs Review']
+    poor = summary['ratings']['Poor']
     
-    avg_quality = df['Educational_Quality'].mean()
-    evaluator_accuracy = (df['Matches_Expected'].sum() / total) * 100
+    avg_quality = float(Fraction(summary['quality_exact_sum']) / summary['quality_count'])
+    evaluator_accuracy = (summary['matches'] / total) * 100
     
     print(f"\n📄 Analysis of: {filename}")
     print(f"📊 Total Responses: {total}")
@@ -177,34 +502,46 @@ def generate_summary_report(df, filename):
     
     print("=" * 70)
 
-def create_analysis_dashboard(df, results_filename):
-    """Generate visual dashboard for pattern analysis"""
+def analysis_dashboard_path(results_filename):
+    """Where the analysis dashboard image for a results file (or combined-runs label) is saved"""
+    # Extract just the filename without path and extension
+    base_filename = os.path.splitext(os.path.basename(results_filename))[0]
+    return f'analysis_dashboards/{base_filename}_analysis.png'
+
+def create_analysis_dashboard(summary, results_filename):
+    """Generate visual dashboard for pattern analysis - returns the image path, or None if it couldn't be drawn"""
     
     print("\n" + "=" * 70)
     print("GENERATING ANALYSIS DASHBOARD")
     print("=" * 70)
+    if not summary['total']:
+        print("⚠ No results to chart - dashboard skipped")
+        return None
     
     try:
+        import matplotlib.pyplot as plt
+        
         # Create analysis_dashboards folder if it doesn't exist
-        os.makedirs('analysis_dashboards', exist_ok=True)
+        dashboard_filename = analysis_dashboard_path(results_filename)
+        os.makedirs(os.path.dirname(dashboard_filename), exist_ok=True)
         
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+        fig, axes = plt.subplots(2, 3, figsize=(21, 10))
         fig.suptitle('Pattern Analysis Dashboard', fontsize=16, fontweight='bold')
         
         # 1. Issue Priority Distribution
         priority_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
         
         # Count priorities
-        safety_issues = df[df['Notes'].str.contains('inappropriate language', case=False, na=False)]
-        mismatches = df[~df['Matches_Expected']]
-        low_performers = df[df['Educational_Quality'] < 0.7]
-        good_responses = df[df['Overall_Rating'] == 'Good']
+        safety_issues = summary['safety_flags']
+        mismatches = summary['mismatches']['count']
+        low_performers = summary['low_quality']['count']
+        good_responses = summary['ratings']['Good']
         
-        if len(safety_issues) > 0 or len(mismatches) > 5:
+        if safety_issues > 0 or mismatches > 5:
             priority_counts['HIGH'] += 1
-        if len(low_performers) > 0:
+        if low_performers > 0:
             priority_counts['MEDIUM'] += 1
-        if len(good_responses) > 0:
+        if good_responses > 0:
             priority_counts['LOW'] += 1
         
         colors_priority = {'HIGH': 'salmon', 'MEDIUM': 'orange', 'LOW': 'lightgreen'}
@@ -221,13 +558,7 @@ def create_analysis_dashboard(df, results_filename):
         
         # 2. Quality Threshold Analysis
         thresholds = ['Poor\n(< 0.3)', 'Needs Work\n(0.3-0.5)', 'Acceptable\n(0.5-0.7)', 'Good\n(0.7-0.9)', 'Excellent\n(≥ 0.9)']
-        threshold_counts = [
-            len(df[df['Educational_Quality'] < 0.3]),
-            len(df[(df['Educational_Quality'] >= 0.3) & (df['Educational_Quality'] < 0.5)]),
-            len(df[(df['Educational_Quality'] >= 0.5) & (df['Educational_Quality'] < 0.7)]),
-            len(df[(df['Educational_Quality'] >= 0.7) & (df['Educational_Quality'] < 0.9)]),
-            len(df[df['Educational_Quality'] >= 0.9])
-        ]
+        threshold_counts = summary['quality_buckets']
         threshold_colors = ['darkred', 'salmon', 'orange', 'lightblue', 'lightgreen']
         
         axes[0, 1].barh(thresholds, threshold_counts, color=threshold_colors)
@@ -238,7 +569,7 @@ def create_analysis_dashboard(df, results_filename):
                 axes[0, 1].text(v + 0.2, i, str(v), va='center')
         
         # 3. Evaluator Calibration
-        match_rate = (df['Matches_Expected'].sum() / len(df)) * 100
+        match_rate = (summary['matches'] / summary['total']) * 100
         mismatch_rate = 100 - match_rate
         
         axes[1, 0].pie([match_rate, mismatch_rate], 
@@ -252,15 +583,15 @@ def create_analysis_dashboard(df, results_filename):
         issue_types = []
         issue_counts = []
         
-        if len(safety_issues) > 0:
+        if safety_issues > 0:
             issue_types.append('Safety\nConcerns')
-            issue_counts.append(len(safety_issues))
-        if len(mismatches) > 0:
+            issue_counts.append(safety_issues)
+        if mismatches > 0:
             issue_types.append('Rating\nMismatches')
-            issue_counts.append(len(mismatches))
-        if len(low_performers) > 0:
+            issue_counts.append(mismatches)
+        if low_performers > 0:
             issue_types.append('Low Quality\nResponses')
-            issue_counts.append(len(low_performers))
+            issue_counts.append(low_performers)
         
         if issue_types:
             axes[1, 1].barh(issue_types, issue_counts, color=['darkred', 'orange', 'gold'][:len(issue_types)])
@@ -275,38 +606,88 @@ def create_analysis_dashboard(df, results_filename):
             axes[1, 1].set_ylim(0, 1)
             axes[1, 1].axis('off')
         
-        plt.tight_layout()
-        
-        # Extract just the filename without path and extension
-        base_filename = os.path.basename(results_filename).replace('.csv', '')
-        dashboard_filename = f'analysis_dashboards/{base_filename}_analysis.png'
+        # 5-6. Quality percentiles per grade level and per topic, read from the quantile sketches
+        for ax, key, title in [(axes[0, 2], 'grade_sketches', 'Quality Percentiles by Grade Level'),
+                               (axes[1, 2], 'topic_sketches', 'Quality Percentiles by Topic')]:
+            sketches = summary[key]
+            if key == 'topic_sketches':
+                # Bars go bottom up, so reverse the report's order to read it top down
+                sketches = dict(sorted(sketches.items(), key=lambda item: (-item[1]['n'], item[0]), reverse=True))
+            percentiles = [sketch_percentiles(sketch) for sketch in sketches.values()]
+            height = 0.8 / 3
+            for offset, (name, color) in enumerate(zip(['p50', 'p90', 'p99'], ['mediumpurple', 'skyblue', 'lightgreen'])):
+                ax.barh([i + (offset - 1) * height for i in range(len(sketches))],
+                        [values[name] for values in percentiles], height=height, color=color, label=name)
+            ax.set_yticks(range(len(sketches)))
+            ax.set_yticklabels(list(sketches))
+            ax.set_xlim(0, 1.05)
+            ax.set_title(title, fontweight='bold')
+            ax.set_xlabel('Educational Quality')
+            ax.legend(loc='upper left', bbox_to_anchor=(1.0, 1.0))
         
+        plt.tight_layout()
         plt.savefig(dashboard_filename, dpi=150, bbox_inches='tight')
+        plt.close(fig)
         print(f"✓ Analysis dashboard saved to: {dashboard_filename}")
         
     except Exception as e:
+        dashboard_filename = None
         print(f"⚠ Could not generate analysis dashboard: {e}")
     
     print("=" * 70)
+    return dashboard_filename
 
-def main():
-    # Find the latest results file
-    results_file = find_latest_results()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pattern analysis and issue triage for evaluation results")
+    parser.add_argument("results", nargs="*",
+                        help="results files to analyze together (default: the latest run)")
+    parser.add_argument("--all-runs", action="store_true",
+                        help="analyze every finished run in the run registry together")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each analysis stage; saves a JSON profile next to the results and prints a table")
+    args = parser.parse_args(argv)
+    profile = new_profile() if args.profile else None
+    run_start = time.perf_counter()
+    
+    if args.all_runs:
+        runs = list_runs(connect_registry()) if os.path.exists(RESULTS_DIR) else []
+        results_files = [run['results_path'] for run in runs if os.path.exists(run['results_path'])]
+    elif args.results:
+        results_files = args.results
+    else:
+        # Find the latest results file
+        latest = find_latest_results()
+        results_files = [latest] if latest else []
     
-    if not results_file:
+    if not results_files:
         print("❌ No results files found. Run evaluate.py first.")
         return
     
+    if len(results_files) == 1:
+        results_file = results_files[0]
+    else:
+        results_file = f'combined_{len(results_files)}_runs'
     print(f"\n🔍 Analyzing: {results_file}\n")
     
-    # Load data
-    df = pd.read_csv(results_file)
+    # Per-file aggregates come from the summary cache; several runs are merged, never re-read
+    summaries = [load_summary(f, profile=profile) for f in results_files]
+    with profile_stage(profile, 'merge'):
+        summary = merge_summaries(summaries)
+    if not summary['total']:
+        print("❌ No results to analyze: the results files have no rows.")
+        return
     
     # Run analyses
-    issues, low_performers, mismatches = analyze_quality_patterns(df)
-    priority_queue = prioritize_issues(df, low_performers, mismatches)
-    generate_summary_report(df, results_file)
-    create_analysis_dashboard(df, results_file)
+    with profile_stage(profile, 'report'):
+        analyze_quality_patterns(summary)
+        priority_queue = prioritize_issues(summary)
+        generate_summary_report(summary, results_file)
+    # Drawn only when these results or the chart code changed since the image was last made
+    with profile_stage(profile, 'dashboard'):
+        result = render('analysis', results_files, label=results_file, summary=summary)
+        finish_render(result)
+    if not result["drawn"]:
+        print(f"\n✓ Analysis dashboard is current: {result['image']}")
     
     print("\n✅ Pattern analysis complete!")
     print("\nThis demonstrates:")
@@ -315,6 +696,11 @@ def main():
     print("  ✓ Issue prioritization and escalation")
     print("  ✓ Data-driven decision making")
     print("  ✓ Executive-level reporting")
+    
+    if profile is not None:
+        label = results_file if len(results_files) == 1 else os.path.join(RESULTS_DIR, results_file)
+        report_profile(profile, profile_path(label, 'analysis'), time.perf_counter() - run_start,
+                       results=results_files, rows=summary['total'])
 
 if __name__ == "__main__":
     main()
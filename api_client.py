@@ -0,0 +1,117 @@
+"""
+API Client - Shared plumbing for high-throughput Messages API calls
+One pooled async anthropic client per run, a token bucket pacing call starts, retries
+with backoff on rate limits / overload / connection errors, and per-run call statistics
+(calls/sec, latency percentiles, tokens); used by the judge and the harvester
+"""
+
+import asyncio
+import os
+import random
+import time
+from stats_utils import percentile
+
+# anthropic (and its httpx) is imported only when a client is created
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RATE = 20.0
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+def new_token_bucket(rate, burst=None):
+    """Rate limiter state: up to `rate` calls per second on average, `burst` at once"""
+    capacity = float(burst or max(1.0, rate))
+    return {"rate": float(rate), "capacity": capacity, "tokens": capacity,
+            "updated": time.monotonic(), "lock": asyncio.Lock()}
+
+async def take_token(bucket):
+    """Wait until the bucket has a token, then spend it (callers are served in arrival order)"""
+    async with bucket["lock"]:
+        while True:
+            now = time.monotonic()
+            bucket["tokens"] = min(bucket["capacity"], bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+            bucket["updated"] = now
+            if bucket["tokens"] >= 1:
+                bucket["tokens"] -= 1
+                return
+            await asyncio.sleep((1 - bucket["tokens"]) / bucket["rate"])
+
+def create_client(concurrency=DEFAULT_CONCURRENCY, base_url=None, api_key=None, timeout=60.0):
+    """
+    One async client for the whole run; its connection pool keeps a connection per
+    concurrent call alive, so requests after the first skip TCP/TLS setup
+    The client's own retries are off - create_message retries through the token bucket
+    """
+    import anthropic
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return anthropic.AsyncAnthropic(
+        api_key=api_key or os.environ.get("ANTHROPIC_API_KEY") or ("standin" if base_url else None),
+        base_url=base_url,
+        max_retries=0,
+        timeout=timeout,
+        http_client=anthropic.DefaultAsyncHttpxClient(limits=limits),
+    )
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying a failed call, or None if it shouldn't be retried"""
+    import anthropic
+
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        retry_after = None
+    elif isinstance(error, anthropic.APIStatusError) and (error.status_code in (408, 409, 429) or error.status_code >= 500):
+        retry_after = error.response.headers.get("retry-after")
+    else:
+        return None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    # Exponential backoff with full jitter, so throttled workers don't retry in lockstep
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def new_call_stats(rows=0):
+    """Counters a run's calls are recorded in"""
+    return {"rows": rows, "calls": 0, "retries": 0, "failures": 0,
+            "input_tokens": 0, "output_tokens": 0, "latencies": [], "seconds": 0.0}
+
+async def create_message(client, bucket, stats, max_retries=DEFAULT_MAX_RETRIES, **params):
+    """
+    Send one Messages API request, paced by the bucket and retried on transient errors
+    Returns the reply text; raises the last error once retries run out
+    """
+    for attempt in range(max_retries + 1):
+        await take_token(bucket)
+        stats["calls"] += 1
+        start = time.perf_counter()
+        try:
+            message = await client.messages.create(**params)
+        except Exception as error:
+            stats["latencies"].append(time.perf_counter() - start)
+            delay = retry_delay(error, attempt)
+            if delay is None or attempt == max_retries:
+                raise
+            stats["retries"] += 1
+            await asyncio.sleep(delay)
+            continue
+        stats["latencies"].append(time.perf_counter() - start)
+        stats["input_tokens"] += message.usage.input_tokens
+        stats["output_tokens"] += message.usage.output_tokens
+        return "".join(block.text for block in message.content if block.type == "text")
+
+def call_report(stats, noun="Rows"):
+    """Throughput and latency lines for a run"""
+    latencies = stats["latencies"]
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    call_rate = stats["calls"] / stats["seconds"] if stats["seconds"] else 0.0
+    return [
+        f"{noun}: {stats['rows']} in {stats['seconds']:.2f}s ({rate:.1f}/sec)",
+        f"API calls: {stats['calls']} ({call_rate:.1f} calls/sec), {stats['retries']} retries, {stats['failures']} failures",
+        "Latency per call: " + ", ".join(
+            f"p{q} {percentile(latencies, q) * 1000:.0f}ms" for q in (50, 90, 99)
+        ) + f", max {max(latencies, default=0.0) * 1000:.0f}ms",
+        f"Tokens: {stats['input_tokens']} in, {stats['output_tokens']} out",
+    ]
@@ -0,0 +1,145 @@
+"""
+API Stand-in - Local imitation of the Messages API endpoint judge.py and harvest.py call
+Judge requests are graded with evaluate_response's accuracy and age-appropriateness
+scores; any other prompt is answered with a response from the bundled prompts/*.csv
+datasets. Replies come after a simulated model latency, and rate-limit and overload
+errors can be injected, so concurrency, pacing and retries can be tested and benchmarked offline
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from evaluate import evaluate_response
+
+MESSAGE_PATTERN = re.compile(r"Grade level: (.*)\nPrompt: (.*)\nResponse: (.*)", re.DOTALL)
+DATASET_GLOB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts", "*.csv")
+
+def load_canned_responses(pattern=DATASET_GLOB):
+    """Responses from the bundled datasets, by lowercased prompt"""
+    responses = {}
+    for path in sorted(glob.glob(pattern)):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                responses.setdefault(row["prompt"].strip().lower(), []).append(row["response"])
+    return responses
+
+def standin_answer(prompt, canned):
+    """A plausible chatbot answer: one of the bundled responses to the prompt, picked by its hash"""
+    choices = canned.get(prompt.strip().lower())
+    if not choices:
+        return f"Great question! {prompt.strip()} Let's explore it step by step with an everyday example."
+    return choices[int(hashlib.sha1(prompt.encode()).hexdigest(), 16) % len(choices)]
+
+def standin_judgement(user_message):
+    """The reply text the stand-in gives for a judge_message"""
+    match = MESSAGE_PATTERN.match(user_message)
+    if not match:
+        return None
+    grade_level, prompt, response = match.groups()
+    scores = evaluate_response(prompt, response, grade_level)
+    return json.dumps({
+        "accuracy": scores["accuracy"],
+        "age_appropriate": scores["age_appropriate"],
+        "rationale": "; ".join(scores["notes"]),
+    })
+
+def make_handler(settings):
+    """Request handler class for a stand-in with these latency and error settings"""
+
+    class StandinHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1 keeps connections open, so clients can reuse them like the real API
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=()):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with settings["lock"]:
+                settings["requests"] += 1
+            if self.path.rstrip("/") != "/v1/messages":
+                self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                return
+
+            roll = random.random()
+            if roll < settings["rate_limit_rate"]:
+                self._send(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "stand-in rate limit"}},
+                           [("retry-after", "0.1")])
+                return
+            if roll < settings["rate_limit_rate"] + settings["overload_rate"]:
+                self._send(529, {"type": "error", "error": {"type": "overloaded_error", "message": "stand-in overloaded"}})
+                return
+
+            time.sleep(max(0.0, random.gauss(settings["latency"], settings["latency"] * settings["jitter"])))
+            user_message = request["messages"][-1]["content"]
+            if isinstance(user_message, list):
+                user_message = "".join(block.get("text", "") for block in user_message)
+            text = standin_judgement(user_message)
+            if text is None:
+                text = standin_answer(user_message, settings["canned"])
+            self._send(200, {
+                "id": f"msg_{uuid.uuid4().hex[:24]}",
+                "type": "message",
+                "role": "assistant",
+                "model": request.get("model", "stand-in"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": len(user_message) // 4, "output_tokens": len(text) // 4},
+            })
+
+    return StandinHandler
+
+def start_standin(port=0, latency=0.2, jitter=0.25, rate_limit_rate=0.0, overload_rate=0.0):
+    """
+    Serve the stand-in from a background thread; returns (server, base_url)
+    Call server.shutdown() to stop it
+    """
+    settings = {"latency": latency, "jitter": jitter, "rate_limit_rate": rate_limit_rate,
+                "overload_rate": overload_rate, "requests": 0, "lock": threading.Lock(),
+                "canned": load_canned_responses()}
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(settings))
+    server.daemon_threads = True
+    server.settings = settings
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Messages API endpoint")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("--latency", type=float, default=0.2, help="mean simulated call latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.25, help="latency standard deviation, as a fraction of the mean")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls answered 429")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="fraction of calls answered 529")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_standin(args.port, args.latency, args.jitter, args.rate_limit_rate, args.overload_rate)
+    print(f"API stand-in listening on {base_url} (Ctrl+C to stop)")
+    print(f"  python3 judge.py results/results_1.csv --base-url {base_url}")
+    print(f"  python3 harvest.py run requests.jsonl --output dataset.csv --base-url {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
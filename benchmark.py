@@ -0,0 +1,445 @@
+"""
+Benchmark Suite - Times the evaluator, analyzer and dashboard on synthetic datasets
+generate expands the prompt files into realistic datasets of any size (10k, 1m, 10m rows);
+run times each stage (load, score, write, analyze, dashboard aggregate, and the row-by-row
+evaluate_response), records peak memory, saves the results as JSON and flags regressions
+against a saved baseline
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# pandas and numpy are imported inside the functions that need them; every measured
+# phase runs in a fresh process, so one phase's memory never shows up in the next
+
+BENCH_DIR = 'benchmarks'
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+BENCH_VERSION = 1
+
+DEFAULT_SIZES = ['10k']
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_SAMPLE = 20_000
+DEFAULT_TOLERANCE = 0.2
+# Changes smaller than these are noise, whatever their percentage
+MIN_SECONDS_CHANGE = 0.05
+MIN_MEMORY_CHANGE_MB = 10.0
+
+# Synthetic rows are variations on the prompt files' rows: the same prompts (so the same
+# topic mix), responses rebuilt from their own sentences (so the same lexicon hit rates),
+# with conversational openers and closers, cut-short and run-on answers, and some grade
+# levels moved, which spreads response lengths the way a chatbot's logs do
+PROMPT_FILES = 'prompts/*.csv'
+PROMPT_OPENERS = ["", "", "", "Quick question: ", "Hi! ", "Can you help? "]
+RESPONSE_OPENERS = ["", "", "", "Great question! ", "Sure! ", "Good thinking. "]
+RESPONSE_CLOSERS = ["", "", "", " Does that make sense?", " Let me know if you want an example!"]
+# Share of responses kept whole, cut to their first sentences, or extended with a
+# sentence from another answer to the same prompt
+RESPONSE_VARIANTS = {"whole": 0.6, "truncated": 0.2, "extended": 0.2}
+GRADE_LEVELS = ["K", "1st", "2nd", "3rd", "4th", "5th", "6th", "7th", "8th", "9th", "10th", "11th", "12th"]
+MOVED_GRADE_SHARE = 0.2
+
+STAGES = ['load', 'score', 'write', 'analyze', 'dashboard', 'evaluate_response']
+
+def parse_size(size):
+    """Row count for a size like '10k', '1m', '10M' or '2500'"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([km]?)', str(size).strip().lower())
+    if not match:
+        raise ValueError(f"not a dataset size: {size!r} (use e.g. 10k, 1m, 10m)")
+    return int(float(match.group(1)) * {'': 1, 'k': 1_000, 'm': 1_000_000}[match.group(2)])
+
+def size_label(rows):
+    """Short label for a row count: 10000 -> '10k', 1000000 -> '1m'"""
+    for suffix, scale in (('m', 1_000_000), ('k', 1_000)):
+        if rows >= scale and rows % scale == 0:
+            return f'{rows // scale}{suffix}'
+    return str(rows)
+
+def load_prompt_pool(pattern=PROMPT_FILES):
+    """Distinct prompt/grade_level/response/expected_quality rows of the prompt files"""
+    import pandas as pd
+
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise FileNotFoundError(f"no prompt files match {pattern}")
+    pool = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+    return pool.drop_duplicates().reset_index(drop=True)
+
+def _response_bodies(pool):
+    """
+    Every response body a synthetic row can have, as (pool row, body) lists
+    Bodies are a response whole, its first sentences, or it plus a sentence from
+    another response to the same prompt
+    """
+    split = [re.split(r'(?<=[.!?])\s+', response.strip()) for response in pool['response']]
+    by_prompt = {}
+    for row, prompt in enumerate(pool['prompt']):
+        by_prompt.setdefault(prompt.lower(), []).append(row)
+
+    bodies = {variant: ([], []) for variant in RESPONSE_VARIANTS}
+    for row, sentences in enumerate(split):
+        bodies['whole'][0].append(row)
+        bodies['whole'][1].append(pool['response'][row])
+        for count in range(1, len(sentences)):
+            bodies['truncated'][0].append(row)
+            bodies['truncated'][1].append(' '.join(sentences[:count]))
+        for other in by_prompt[pool['prompt'][row].lower()]:
+            if other != row:
+                for sentence in split[other]:
+                    bodies['extended'][0].append(row)
+                    bodies['extended'][1].append(f"{pool['response'][row].strip()} {sentence}")
+    # Prompts with a single short answer have nothing to cut or add; they stay whole
+    return {variant: rows_bodies for variant, rows_bodies in bodies.items() if rows_bodies[0]}
+
+def generate_chunks(rows, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, pool=None):
+    """Yield synthetic prompt/grade_level/response/expected_quality frames totalling rows rows"""
+    import numpy as np
+    import pandas as pd
+
+    pool = load_prompt_pool() if pool is None else pool
+    rng = np.random.default_rng(seed)
+    bodies = _response_bodies(pool)
+    variants = list(bodies)
+    shares = np.array([RESPONSE_VARIANTS[variant] for variant in variants])
+    body_rows = [np.array(bodies[variant][0]) for variant in variants]
+    body_text = [np.array(bodies[variant][1], dtype=object) for variant in variants]
+    prompts = pool['prompt'].to_numpy(dtype=object)
+    grades = pool['grade_level'].astype(str).to_numpy(dtype=object)
+    expected = pool['expected_quality'].to_numpy(dtype=object)
+
+    def pick(choices, size):
+        return np.array(choices, dtype=object)[rng.integers(0, len(choices), size)]
+
+    for start in range(0, rows, chunk_size):
+        size = min(chunk_size, rows - start)
+        variant = rng.choice(len(variants), size=size, p=shares / shares.sum())
+        base = np.empty(size, dtype=np.int64)
+        body = np.empty(size, dtype=object)
+        for index in range(len(variants)):
+            chosen = np.flatnonzero(variant == index)
+            picked = rng.integers(0, len(body_rows[index]), len(chosen))
+            base[chosen] = body_rows[index][picked]
+            body[chosen] = body_text[index][picked]
+
+        grade = grades[base]
+        moved = rng.random(size) < MOVED_GRADE_SHARE
+        grade[moved] = pick(GRADE_LEVELS, int(moved.sum()))
+        yield pd.DataFrame({
+            'prompt': pick(PROMPT_OPENERS, size) + prompts[base],
+            'grade_level': grade,
+            'response': pick(RESPONSE_OPENERS, size) + body + pick(RESPONSE_CLOSERS, size),
+            'expected_quality': expected[base],
+        })
+
+def generate_dataset(rows, output, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write a synthetic dataset CSV of rows rows; returns a description of it"""
+    import numpy as np
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    start = time.perf_counter()
+    lengths = []
+    temp_path = f'{output}.{os.getpid()}.tmp'
+    for index, chunk in enumerate(generate_chunks(rows, seed, chunk_size)):
+        chunk.to_csv(temp_path, mode='a' if index else 'w', header=not index, index=False)
+        lengths.append(chunk['response'].str.len().to_numpy())
+    os.replace(temp_path, output)
+    lengths = np.concatenate(lengths) if lengths else np.zeros(0)
+    return {
+        'path': output,
+        'rows': rows,
+        'seed': seed,
+        'bytes': os.path.getsize(output),
+        'response_length': {
+            'mean': round(float(lengths.mean()), 1) if len(lengths) else 0.0,
+            'p50': float(np.percentile(lengths, 50)) if len(lengths) else 0.0,
+            'p90': float(np.percentile(lengths, 90)) if len(lengths) else 0.0,
+        },
+        'generate_seconds': round(time.perf_counter() - start, 3),
+    }
+
+def dataset_path(rows, seed=0):
+    return os.path.join(DATA_DIR, f'synthetic_{size_label(rows)}_seed{seed}.csv')
+
+def peak_rss_mb():
+    """This process's peak resident memory in MB (None where the platform can't say)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024, 1)
+
+def _new_timing():
+    return {'seconds': 0.0, 'cpu_seconds': 0.0}
+
+@contextlib.contextmanager
+def _timed(timing):
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        timing['seconds'] += time.perf_counter() - wall
+        timing['cpu_seconds'] += time.process_time() - cpu
+
+def _phase_result(stages, baseline_rss):
+    for timing in stages.values():
+        timing['seconds'] = round(timing['seconds'], 4)
+        timing['cpu_seconds'] = round(timing['cpu_seconds'], 4)
+    return {'stages': stages, 'baseline_rss_mb': baseline_rss, 'peak_rss_mb': peak_rss_mb()}
+
+def _evaluate_phase(dataset, results_file, chunk_size):
+    """load, score and write: evaluate.py's streamed pipeline, timed stage by stage"""
+    import pandas as pd
+    from evaluate import results_frame, score_batch
+    from results_io import append_results, close_results, open_results
+
+    baseline = peak_rss_mb()
+    stages = {name: _new_timing() for name in ('load', 'score', 'write')}
+    writer = open_results(results_file)
+    first_test_id = 1
+    with _timed(stages['load']):
+        chunks = pd.read_csv(dataset, chunksize=chunk_size)
+    while True:
+        with _timed(stages['load']):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with _timed(stages['score']):
+            results = results_frame(chunk, score_batch(chunk), first_test_id)
+        with _timed(stages['write']):
+            append_results(writer, results)
+        first_test_id += len(chunk)
+    with _timed(stages['write']):
+        close_results(writer)
+    return _phase_result(stages, baseline)
+
+def _analyze_phase(results_file):
+    """analyze: what analyze_patterns does on a results file its summary cache hasn't seen"""
+    from analyze_patterns import ANALYSIS_COLUMNS, summarize_results
+    from results_io import read_results
+
+    baseline = peak_rss_mb()
+    stages = {'analyze': _new_timing()}
+    with _timed(stages['analyze']):
+        summarize_results(read_results(results_file, lambda name: name in ANALYSIS_COLUMNS), results_file)
+    return _phase_result(stages, baseline)
+
+def _dashboard_phase(results_file):
+    """
+    dashboard: dashboard_app's load_data read plus the aggregates its overview and
+    quality tabs chart (the app itself is a Streamlit script and can't be imported)
+    """
+    from results_io import read_results
+
+    baseline = peak_rss_mb()
+    stages = {'dashboard': _new_timing()}
+    with _timed(stages['dashboard']):
+        df = read_results(results_file, columns=lambda name: name != 'Response')
+        df['Overall_Rating'].value_counts()
+        df['Educational_Quality'].mean()
+        df['Matches_Expected'].sum()
+        df.groupby('Grade_Level', observed=True)['Educational_Quality'].agg(['mean', 'count'])
+        df.groupby(['Grade_Level', 'Overall_Rating'], observed=True).size()
+    return _phase_result(stages, baseline)
+
+def _evaluate_response_phase(dataset, sample):
+    """evaluate_response: the row-by-row scorer on the first sample rows"""
+    import pandas as pd
+    from evaluate import evaluate_response
+
+    data = pd.read_csv(dataset, nrows=sample)
+    rows = list(zip(data['prompt'], data['response'], data['grade_level'].astype(str)))
+    baseline = peak_rss_mb()
+    stages = {'evaluate_response': _new_timing()}
+    with _timed(stages['evaluate_response']):
+        for prompt, response, grade_level in rows:
+            evaluate_response(prompt, response, grade_level)
+    stages['evaluate_response']['rows'] = len(rows)
+    return _phase_result(stages, baseline)
+
+def _run_phase(function, *args):
+    """Run one measured phase in a fresh interpreter, so its peak memory is its own"""
+    import multiprocessing
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(function, *args).result()
+
+def benchmark_size(rows, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, results_format='csv',
+                   sample=DEFAULT_SAMPLE, regenerate=False, keep_results=False):
+    """Benchmark every stage on a synthetic dataset of rows rows (generated once, then reused)"""
+    dataset = dataset_path(rows, seed)
+    if regenerate or not os.path.exists(dataset):
+        print(f"  generating {size_label(rows)} rows -> {dataset}")
+        description = generate_dataset(rows, dataset, seed, chunk_size)
+    else:
+        description = {'path': dataset, 'rows': rows, 'seed': seed, 'bytes': os.path.getsize(dataset)}
+
+    work_dir = os.path.join(BENCH_DIR, 'work')
+    os.makedirs(work_dir, exist_ok=True)
+    results_file = os.path.join(work_dir, f'results_{size_label(rows)}.{results_format}')
+    phases = {}
+    try:
+        phases['evaluate'] = _run_phase(_evaluate_phase, dataset, results_file, chunk_size)
+        phases['analyze'] = _run_phase(_analyze_phase, results_file)
+        phases['dashboard'] = _run_phase(_dashboard_phase, results_file)
+        phases['evaluate_response'] = _run_phase(_evaluate_response_phase, dataset, min(sample, rows))
+    finally:
+        if not keep_results and os.path.exists(results_file):
+            os.remove(results_file)
+
+    stages = {}
+    for phase, result in phases.items():
+        for name, timing in result['stages'].items():
+            counted = timing.pop('rows', rows)
+            timing['rows_per_sec'] = round(counted / timing['seconds']) if timing['seconds'] else None
+            timing['peak_rss_mb'] = result['peak_rss_mb']
+            timing['phase'] = phase
+            stages[name] = timing
+    return {
+        'rows': rows,
+        'dataset': description,
+        'stages': stages,
+        'phases': {phase: {'baseline_rss_mb': result['baseline_rss_mb'], 'peak_rss_mb': result['peak_rss_mb']}
+                   for phase, result in phases.items()},
+    }
+
+def run_benchmarks(sizes, **options):
+    """Benchmark each dataset size; returns the JSON-ready results"""
+    import pandas as pd
+
+    runs = []
+    for size in sizes:
+        rows = parse_size(size)
+        print(f"\n⏱  Benchmarking {size_label(rows)} rows")
+        runs.append(benchmark_size(rows, **options))
+    return {
+        'version': BENCH_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': {key: value for key, value in options.items() if key in ('seed', 'chunk_size', 'results_format', 'sample')},
+        'runs': runs,
+    }
+
+def find_regressions(current, baseline, tolerance=DEFAULT_TOLERANCE, memory_tolerance=DEFAULT_TOLERANCE):
+    """
+    Stage timings and phase peak memory that grew past tolerance (a fraction) of the
+    baseline's for the same dataset size; returns one dict per regression
+    """
+    baseline_runs = {run['rows']: run for run in baseline.get('runs', [])}
+    regressions = []
+    for run in current['runs']:
+        before = baseline_runs.get(run['rows'])
+        if before is None:
+            continue
+        checks = [(f'{stage}.seconds', timing['seconds'], before['stages'].get(stage, {}).get('seconds'),
+                   tolerance, MIN_SECONDS_CHANGE)
+                  for stage, timing in run['stages'].items()]
+        checks += [(f'{phase}.peak_rss_mb', memory['peak_rss_mb'], before['phases'].get(phase, {}).get('peak_rss_mb'),
+                    memory_tolerance, MIN_MEMORY_CHANGE_MB)
+                   for phase, memory in run['phases'].items()]
+        for metric, value, old, allowed, floor in checks:
+            if value is None or not old:
+                continue
+            if value > old * (1 + allowed) and value - old > floor:
+                regressions.append({'rows': run['rows'], 'metric': metric, 'baseline': old,
+                                    'current': value, 'change': round(value / old - 1, 3)})
+    return regressions
+
+def print_report(results, regressions):
+    print("\n" + "=" * 78)
+    print("BENCHMARK RESULTS")
+    print("=" * 78)
+    for run in results['runs']:
+        print(f"\n{size_label(run['rows'])} rows ({run['dataset']['bytes'] / (1 << 20):.1f} MB input)")
+        print(f"  {'Stage':<18} {'Wall (s)':>10} {'CPU (s)':>10} {'Rows/sec':>12} {'Peak MB':>10}")
+        for stage in STAGES:
+            timing = run['stages'].get(stage)
+            if timing is None:
+                continue
+            rate = f"{timing['rows_per_sec']:,}" if timing['rows_per_sec'] else '-'
+            peak = f"{timing['peak_rss_mb']:.0f}" if timing['peak_rss_mb'] is not None else '-'
+            print(f"  {stage:<18} {timing['seconds']:>10.3f} {timing['cpu_seconds']:>10.3f} {rate:>12} {peak:>10}")
+    if regressions:
+        print(f"\n⚠ {len(regressions)} regressions against the baseline:")
+        for item in regressions:
+            print(f"  {size_label(item['rows'])} {item['metric']}: {item['baseline']} -> {item['current']} "
+                  f"(+{item['change'] * 100:.0f}%)")
+    print("=" * 78)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the evaluator, analyzer and dashboard on synthetic data")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic dataset CSV")
+    generate.add_argument("size", help="rows to generate, e.g. 10k, 1m, 10m")
+    generate.add_argument("--output", help="CSV to write (default: benchmarks/data/synthetic_<size>_seed<seed>.csv)")
+    generate.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+
+    run = commands.add_parser("run", help="benchmark every stage and compare against the baseline")
+    run.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                     help=f"dataset sizes to benchmark (default: {' '.join(DEFAULT_SIZES)})")
+    run.add_argument("--seed", type=int, default=0, help="random seed of the synthetic datasets (default: 0)")
+    run.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                     help=f"rows per streamed chunk (default: {DEFAULT_CHUNK_SIZE})")
+    run.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                     help="results format written and read back (default: csv)")
+    run.add_argument("--sample", type=int, default=DEFAULT_SAMPLE,
+                     help=f"rows scored one at a time with evaluate_response (default: {DEFAULT_SAMPLE})")
+    run.add_argument("--output", help="results JSON to write (default: benchmarks/bench_<timestamp>.json)")
+    run.add_argument("--baseline", default=BASELINE_PATH, help=f"baseline to compare with (default: {BASELINE_PATH})")
+    run.add_argument("--save-baseline", action="store_true", help="make this run the new baseline")
+    run.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                     help=f"slowdown that counts as a regression, as a fraction (default: {DEFAULT_TOLERANCE})")
+    run.add_argument("--memory-tolerance", type=float, default=DEFAULT_TOLERANCE,
+                     help=f"peak memory growth that counts as a regression (default: {DEFAULT_TOLERANCE})")
+    run.add_argument("--regenerate", action="store_true", help="rebuild the synthetic datasets even if they exist")
+    run.add_argument("--keep-results", action="store_true", help="keep the results files under benchmarks/work")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        rows = parse_size(args.size)
+        description = generate_dataset(rows, args.output or dataset_path(rows, args.seed), args.seed)
+        print(f"✓ {rows} rows written to: {description['path']} "
+              f"({description['bytes'] / (1 << 20):.1f} MB, {description['generate_seconds']:.1f}s)")
+        return
+
+    results = run_benchmarks(
+        args.sizes, seed=args.seed, chunk_size=args.chunk_size, results_format=args.format,
+        sample=args.sample, regenerate=args.regenerate, keep_results=args.keep_results,
+    )
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance, args.memory_tolerance) if baseline else []
+    results['regressions'] = regressions
+    print_report(results, regressions)
+
+    output = args.output or os.path.join(BENCH_DIR, f"bench_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"\n✓ Benchmark results saved to: {output}")
+    if args.save_baseline:
+        shutil.copyfile(output, args.baseline)
+        print(f"✓ Saved as the baseline: {args.baseline}")
+    elif baseline is None:
+        print(f"  No baseline yet - save one with --save-baseline")
+    if regressions:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
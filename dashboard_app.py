@@ -4,6 +4,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 import os
+from analyze_patterns import load_summary
+from quality_sketch import histogram_edges, sketch_percentiles
+from results_io import read_results
+from run_registry import RESULTS_DIR, connect_registry, list_runs, run_trends
 
 st.set_page_config(page_title="LLM Quality Dashboard", layout="wide", page_icon="📊")
 
@@ -14,9 +18,10 @@ st.markdown("Interactive dashboard for monitoring LLM response quality and evalu
 # Sidebar for file selection
 st.sidebar.header("Select Results File")
 
-# Get all results files
-results_dir = Path("results")
-results_files = sorted(results_dir.glob("results_*.csv"), key=lambda x: int(x.stem.split('_')[1]))
+# Get all finished runs from the run registry
+registry = connect_registry() if Path(RESULTS_DIR).exists() else None
+runs = list_runs(registry) if registry else []
+results_files = [Path(run['results_path']) for run in runs]
 
 if not results_files:
     st.error("No results files found in the results/ folder. Please run evaluate.py first.")
@@ -32,9 +37,16 @@ selected_file = st.sidebar.selectbox(
 # Load data
 @st.cache_data
 def load_data(file_path):
-    return pd.read_csv(file_path)
+    # The dashboard never shows the full Response text, so skip that column
+    return read_results(str(file_path), columns=lambda name: name != 'Response')
+
+# Counts, the quality histogram and the quantile sketches, from the cached summary
+@st.cache_data
+def load_file_summary(file_path):
+    return load_summary(str(file_path))
 
 df = load_data(selected_file)
+summary = load_file_summary(selected_file)
 
 # Check which columns exist
 has_expected_quality = 'Expected_Quality' in df.columns
@@ -49,9 +61,9 @@ if has_matches:
 
 # Main dashboard content
 if has_expected_quality:
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📈 Quality Analysis", "🎯 Evaluator Performance", "📋 Detailed Results"])
+    tab1, tab2, tab3, tab4, trends_tab = st.tabs(["📊 Overview", "📈 Quality Analysis", "🎯 Evaluator Performance", "📋 Detailed Results", "📉 Trends"])
 else:
-    tab1, tab2, tab3 = st.tabs(["📊 Overview", "📈 Quality Analysis", "📋 Detailed Results"])
+    tab1, tab2, tab3, trends_tab = st.tabs(["📊 Overview", "📈 Quality Analysis", "📋 Detailed Results", "📉 Trends"])
 
 with tab1:
     st.header("Quality Distribution Overview")
@@ -107,19 +119,36 @@ with tab1:
 with tab2:
     st.header("Educational Quality Analysis")
     
-    # Quality score distribution
-    fig_hist = px.histogram(
-        df,
-        x='Educational_Quality',
-        nbins=20,
+    # Quality score distribution, from the summary's fixed-bin histogram
+    histogram = summary['quality_histogram']
+    edges = histogram_edges(histogram)
+    fig_hist = px.bar(
+        x=[(low + high) / 2 for low, high in zip(edges[:-1], edges[1:])],
+        y=histogram['counts'],
         title="Educational Quality Score Distribution",
-        labels={'Educational_Quality': 'Quality Score'},
+        labels={'x': 'Quality Score', 'y': 'Count'},
         color_discrete_sequence=['#6f42c1']
     )
+    fig_hist.update_traces(width=edges[1] - edges[0])
     st.plotly_chart(fig_hist, width='stretch')
     
+    # Percentiles read from the quantile sketches
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("📐 Quality Percentiles by Grade Level")
+        st.dataframe(pd.DataFrame(
+            [{'Grade_Level': grade, **sketch_percentiles(sketch), 'count': sketch['n']}
+             for grade, sketch in summary['grade_sketches'].items()]
+        ), width='stretch', hide_index=True)
+    with col2:
+        st.subheader("🧪 Quality Percentiles by Topic")
+        st.dataframe(pd.DataFrame(
+            [{'Topic': topic, **sketch_percentiles(sketch), 'count': sketch['n']}
+             for topic, sketch in sorted(summary['topic_sketches'].items(), key=lambda item: (-item[1]['n'], item[0]))]
+        ), width='stretch', hide_index=True)
+    
     # Quality by grade level
-    grade_quality = df.groupby('Grade_Level')['Educational_Quality'].agg(['mean', 'min', 'max', 'count']).reset_index()
+    grade_quality = df.groupby('Grade_Level', observed=True)['Educational_Quality'].agg(['mean', 'min', 'max', 'count']).reset_index()
     grade_quality = grade_quality.sort_values('mean', ascending=False)
     
     fig_grade = go.Figure()
@@ -171,7 +200,7 @@ if has_expected_quality:
         
         with col2:
             # Rating comparison bar chart
-            comparison_data = df.groupby(['Expected_Quality', 'Overall_Rating']).size().reset_index(name='count')
+            comparison_data = df.groupby(['Expected_Quality', 'Overall_Rating'], observed=True).size().reset_index(name='count')
             fig_comparison = px.bar(
                 comparison_data,
                 x='Expected_Quality',
@@ -271,6 +300,106 @@ with detailed_tab:
         mime="text/csv"
     )
 
+# Trends tab: plotted from the per-run summaries in the run registry, never the results files
+with trends_tab:
+    st.header("Trends Across Runs")
+    
+    run_limit = st.number_input("Show the last N runs:", min_value=2, max_value=100000, value=500, step=50)
+    trend_runs, trend_grades = run_trends(registry, int(run_limit))
+    
+    if len(trend_runs) < 2:
+        st.info("Trends appear once at least two runs have finished with this version of evaluate.py.")
+    else:
+        trend_df = pd.DataFrame(trend_runs)
+        grade_trend_df = pd.DataFrame(trend_grades)
+        
+        latest, previous = trend_df.iloc[-1], trend_df.iloc[-2]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Evaluator Accuracy (latest run)", f"{latest['match_rate'] * 100:.1f}%",
+                    delta=f"{(latest['match_rate'] - previous['match_rate']) * 100:.1f} pts")
+        col2.metric("Mean Quality (latest run)", f"{latest['mean_quality']:.2f}",
+                    delta=f"{latest['mean_quality'] - previous['mean_quality']:.2f}")
+        col3.metric("Safety Issues (latest run)", int(latest['safety_issues']),
+                    delta=int(latest['safety_issues'] - previous['safety_issues']), delta_color="inverse")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            fig_accuracy_trend = px.line(
+                trend_df, x='run_id', y='match_rate', markers=True,
+                title="Evaluator Accuracy by Run",
+                labels={'run_id': 'Run', 'match_rate': 'Match Rate'}
+            )
+            fig_accuracy_trend.update_yaxes(tickformat='.0%')
+            st.plotly_chart(fig_accuracy_trend, width='stretch')
+        
+        with col2:
+            fig_quality_trend = px.line(
+                trend_df, x='run_id', y='mean_quality', markers=True,
+                title="Mean Educational Quality by Run",
+                labels={'run_id': 'Run', 'mean_quality': 'Mean Quality'}
+            )
+            st.plotly_chart(fig_quality_trend, width='stretch')
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Rating shares rather than counts, so runs of different sizes compare
+            rating_columns = {'excellent': 'Excellent', 'good': 'Good', 'needs_review': 'Needs Review', 'poor': 'Poor'}
+            rating_trend = trend_df.melt(id_vars=['run_id', 'row_count'], value_vars=list(rating_columns),
+                                         var_name='Rating', value_name='count')
+            rating_trend['Rating'] = rating_trend['Rating'].map(rating_columns)
+            rating_trend['share'] = rating_trend['count'] / rating_trend['row_count']
+            fig_rating_trend = px.area(
+                rating_trend, x='run_id', y='share', color='Rating',
+                title="Rating Mix by Run",
+                labels={'run_id': 'Run', 'share': 'Share of Responses'},
+                color_discrete_map={
+                    'Excellent': '#28a745',
+                    'Good': '#17a2b8',
+                    'Needs Review': '#ffc107',
+                    'Poor': '#dc3545'
+                }
+            )
+            fig_rating_trend.update_yaxes(tickformat='.0%')
+            st.plotly_chart(fig_rating_trend, width='stretch')
+        
+        with col2:
+            fig_safety_trend = px.bar(
+                trend_df, x='run_id', y='safety_issues',
+                title="Safety Issues by Run",
+                labels={'run_id': 'Run', 'safety_issues': 'Safety Issues'},
+                color_discrete_sequence=['#dc3545']
+            )
+            st.plotly_chart(fig_safety_trend, width='stretch')
+        
+        # Per-grade quality, one grade at a time with its min/max band
+        st.subheader("Quality by Grade Level")
+        grade_options = sorted(grade_trend_df['grade_level'].unique())
+        selected_grades = st.multiselect("Grade levels:", options=grade_options, default=grade_options[:5])
+        grade_view = grade_trend_df[grade_trend_df['grade_level'].isin(selected_grades)]
+        
+        fig_grade_trend = go.Figure()
+        for grade, rows in grade_view.groupby('grade_level'):
+            fig_grade_trend.add_trace(go.Scatter(
+                x=rows['run_id'],
+                y=rows['mean_quality'],
+                mode='lines+markers',
+                name=grade,
+                error_y=dict(
+                    type='data',
+                    symmetric=False,
+                    array=rows['max_quality'] - rows['mean_quality'],
+                    arrayminus=rows['mean_quality'] - rows['min_quality']
+                )
+            ))
+        fig_grade_trend.update_layout(
+            title="Mean Quality by Grade Level (with min/max range)",
+            xaxis_title="Run",
+            yaxis_title="Quality Score"
+        )
+        st.plotly_chart(fig_grade_trend, width='stretch')
+
 # Footer
 st.markdown("---")
 st.markdown("Built with ❤️ for Educational LLM Quality Analysis")
\ No newline at end of file
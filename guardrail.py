@@ -0,0 +1,130 @@
+"""
+Streaming Guardrail - Safety verdicts for a response while it is still being streamed
+Chunks of a token-streamed response are fed in as they arrive; the inappropriate-language
+and unsafe-keyword lexicons are matched with one Aho-Corasick walk whose state carries
+over between chunks, so a term split across chunks is still caught, and the verdict turns
+unsafe on the very chunk that completes a flagged term. Each chunk costs time in
+proportion to its own length, however long the response has grown
+"""
+
+import argparse
+import csv
+import time
+from rubrics import ISSUE_INAPPROPRIATE, ISSUE_NOTES, ISSUE_SAFETY, SAFETY_SCANNER
+from scanner import finish_stream, new_stream, scan_chunk
+from stats_utils import percentile
+
+# The Issue_Codes bit evaluate_response records for a hit in each lexicon
+LEXICON_ISSUES = {"inappropriate": ISSUE_INAPPROPRIATE, "unsafe": ISSUE_SAFETY}
+DEFAULT_CHUNK_SIZE = 4
+
+def new_guardrail(scanner=SAFETY_SCANNER):
+    """Guardrail state for one streamed response"""
+    return {
+        "scanner": scanner,
+        "stream": new_stream(scanner),
+        "issue_codes": 0,
+        "terms": set(),
+        # Characters streamed when the first flagged term was complete
+        "flagged_at": None,
+        "finished": False,
+    }
+
+def verdict(guard):
+    """The guardrail's verdict so far: safe until a flagged term has been seen, then unsafe for good"""
+    codes = guard["issue_codes"]
+    return {
+        "safe": codes == 0,
+        "issue_codes": codes,
+        "notes": [note for bit, note in ISSUE_NOTES.items() if codes & bit],
+        "terms": sorted(guard["terms"]),
+        "flagged_at": guard["flagged_at"],
+        "chars_seen": guard["stream"]["offset"],
+        "final": guard["finished"],
+    }
+
+def _record(guard, hits):
+    for _, end, name, term in hits:
+        guard["issue_codes"] |= LEXICON_ISSUES[name]
+        guard["terms"].add(term)
+        if guard["flagged_at"] is None:
+            guard["flagged_at"] = end
+    return verdict(guard)
+
+def feed(guard, chunk):
+    """Add the next chunk of the response; returns the verdict so far"""
+    return _record(guard, scan_chunk(guard["scanner"], guard["stream"], chunk.lower()))
+
+def finish(guard):
+    """End of the response; returns the final verdict (the same flags evaluate_response sets on the whole text)"""
+    guard["finished"] = True
+    return _record(guard, finish_stream(guard["stream"]))
+
+def check_stream(chunks, stop_early=True):
+    """Verdict for an iterable of chunks, stopping at the first flag unless stop_early is False"""
+    guard = new_guardrail()
+    for chunk in chunks:
+        if not feed(guard, chunk)["safe"] and stop_early:
+            return verdict(guard)
+    return finish(guard)
+
+def chunked(text, chunk_size):
+    """Split text into chunk_size-character pieces, as a stand-in for streamed tokens"""
+    return [text[start:start + chunk_size] for start in range(0, len(text), chunk_size)]
+
+def replay_dataset(csv_file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream every response of a dataset through the guardrail in chunk_size pieces and
+    compare with evaluate_response on the finished text
+    Returns stats: responses, flagged, agreement, streamed share at the flag, per-chunk seconds
+    """
+    from evaluate import evaluate_response
+
+    stats = {"responses": 0, "flagged": 0, "agree": 0, "flag_shares": [], "chunk_seconds": []}
+    safety_bits = ISSUE_INAPPROPRIATE | ISSUE_SAFETY
+    with open(csv_file, newline="") as f:
+        for row in csv.DictReader(f):
+            response = row["response"]
+            guard = new_guardrail()
+            for chunk in chunked(response, chunk_size):
+                start = time.perf_counter()
+                feed(guard, chunk)
+                stats["chunk_seconds"].append(time.perf_counter() - start)
+            final = finish(guard)
+            expected = evaluate_response(row["prompt"], response, row["grade_level"])["issue_codes"] & safety_bits
+            stats["responses"] += 1
+            stats["agree"] += final["issue_codes"] == expected
+            if not final["safe"]:
+                stats["flagged"] += 1
+                stats["flag_shares"].append(final["flagged_at"] / max(len(response), 1))
+    return stats
+
+def replay_report(stats, chunk_size):
+    """Result lines for replay_dataset"""
+    shares = stats["flag_shares"]
+    chunk_us = [seconds * 1e6 for seconds in stats["chunk_seconds"]]
+    lines = [
+        f"Responses streamed: {stats['responses']} in {chunk_size}-character chunks",
+        f"Flagged: {stats['flagged']}, verdicts matching evaluate_response: {stats['agree']}/{stats['responses']}",
+    ]
+    if shares:
+        lines.append(f"Flag raised after {sum(shares) / len(shares) * 100:.0f}% of a flagged response on average "
+                     f"(median {percentile(shares, 50) * 100:.0f}%)")
+    lines.append("Per-chunk cost: " + ", ".join(f"p{q} {percentile(chunk_us, q):.1f}µs" for q in (50, 90, 99)))
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream responses through the safety guardrail chunk by chunk")
+    parser.add_argument("dataset", help="prompt/grade_level/response CSV whose responses are replayed as streams")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"characters per streamed chunk (default: {DEFAULT_CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    print(f"\n🛡️  Streaming guardrail replay: {args.dataset}\n")
+    for line in replay_report(replay_dataset(args.dataset, args.chunk_size), args.chunk_size):
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Response Harvester - Generates evaluation datasets from a model's answers
+prepare turns a prompt,grade_level[,expected_quality] CSV into batch request JSONL;
+run sends those requests through the pooled, rate-limited async client and streams each
+answer straight into the prompt,grade_level,response,expected_quality CSV evaluate.py reads
+Finished request IDs are logged with the CSV offset after their row, so an interrupted
+run resumes where it stopped without repeating or losing rows
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import time
+from api_client import (
+    DEFAULT_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_RATE, call_report, create_client, create_message,
+    new_call_stats, new_token_bucket,
+)
+from results_io import DATASET_COLUMNS
+
+DEFAULT_MODEL = "claude-3-5-haiku-20241022"
+DEFAULT_MAX_TOKENS = 400
+
+SYSTEM_PROMPT = ("You are a friendly educational chatbot talking with a student (grade level: {grade_level}). "
+                 "Answer in a warm, conversational tone at their reading level, accurately and in a few sentences.")
+
+def request_id(index, model, prompt, grade_level):
+    """Stable ID for a request: its position plus a hash of what is asked"""
+    digest = hashlib.sha1(f"{model}\x1f{prompt}\x1f{grade_level}".encode()).hexdigest()
+    return f"{index:08d}-{digest[:8]}"
+
+def prepare_requests(prompts_csv, requests_jsonl, model=DEFAULT_MODEL, max_tokens=DEFAULT_MAX_TOKENS):
+    """
+    Write one batch request per prompt row (Message Batches layout: custom_id + params)
+    The row's dataset fields ride along under "dataset" for the results CSV
+    Streams both files, so prompt lists of any size take constant memory; returns the count
+    """
+    count = 0
+    with open(prompts_csv, newline="") as source, open(requests_jsonl, "w") as out:
+        for index, row in enumerate(csv.DictReader(source), 1):
+            prompt, grade_level = row["prompt"], row["grade_level"]
+            out.write(json.dumps({
+                "custom_id": request_id(index, model, prompt, grade_level),
+                "params": {
+                    "model": model,
+                    "max_tokens": max_tokens,
+                    "system": SYSTEM_PROMPT.format(grade_level=grade_level),
+                    "messages": [{"role": "user", "content": prompt}],
+                },
+                "dataset": {"prompt": prompt, "grade_level": grade_level,
+                            "expected_quality": row.get("expected_quality", "")},
+            }) + "\n")
+            count += 1
+    return count
+
+def progress_path(output_csv):
+    return output_csv + ".progress"
+
+def _open_output(output_csv, overwrite=False):
+    """
+    Open the dataset CSV for appending, recovering from an interrupted run
+    Returns (csv file, progress file, IDs already harvested)
+    The CSV is cut back to the offset after the last logged row, dropping any row
+    written but not yet logged (its request is simply sent again); an existing CSV
+    without a progress log to resume from is only replaced if overwrite is set
+    """
+    done, offset, logged = set(), None, 0
+    if os.path.exists(output_csv) and os.path.exists(progress_path(output_csv)):
+        with open(progress_path(output_csv)) as f:
+            for line in f:
+                # A line cut off mid-write is ignored (and cut from the log below)
+                if not line.endswith("\n"):
+                    break
+                custom_id, _, row_end = line.rstrip("\n").partition("\t")
+                if custom_id:
+                    done.add(custom_id)
+                offset = int(row_end)
+                logged += len(line.encode())
+
+    if offset is None:
+        if os.path.exists(output_csv) and not overwrite:
+            raise FileExistsError(f"{output_csv} already exists and has no progress log to resume from "
+                                  f"({progress_path(output_csv)}); pass --overwrite to replace it")
+        output = open(output_csv, "w", newline="")
+        csv.writer(output).writerow(DATASET_COLUMNS)
+        output.flush()
+        progress = open(progress_path(output_csv), "w")
+        progress.write(f"\t{output.tell()}\n")
+        progress.flush()
+        return output, progress, done
+
+    output = open(output_csv, "r+", newline="")
+    output.truncate(offset)
+    output.seek(offset)
+    progress = open(progress_path(output_csv), "r+")
+    progress.truncate(logged)
+    progress.seek(logged)
+    return output, progress, done
+
+def _pending_requests(requests_jsonl, done):
+    with open(requests_jsonl) as f:
+        for line in f:
+            if line.strip():
+                request = json.loads(line)
+                if request["custom_id"] not in done:
+                    yield request
+
+async def harvest_async(requests_jsonl, output_csv, client, concurrency=DEFAULT_CONCURRENCY,
+                        rate=DEFAULT_RATE, max_retries=DEFAULT_MAX_RETRIES, overwrite=False):
+    """
+    Send every request not yet harvested, appending each answer to output_csv as it arrives
+    Returns stats (rows written, calls, retries, failures, latencies, ...); failed
+    requests are left out of the progress log so the next run retries them
+    FileExistsError if output_csv exists without a progress log, unless overwrite is set
+    """
+    output, progress, done = _open_output(output_csv, overwrite)
+    stats = new_call_stats()
+    stats["skipped"] = len(done)
+    bucket = new_token_bucket(rate)
+    writer = csv.writer(output)
+    pending = _pending_requests(requests_jsonl, done)
+
+    # A fixed set of workers pulling requests keeps memory bounded however long the JSONL is
+    async def worker():
+        for request in pending:
+            try:
+                response = await create_message(client, bucket, stats, max_retries, **request["params"])
+            except Exception:
+                stats["failures"] += 1
+                continue
+            dataset = request["dataset"]
+            writer.writerow([dataset["prompt"], dataset["grade_level"], response, dataset["expected_quality"]])
+            output.flush()
+            progress.write(f"{request['custom_id']}\t{output.tell()}\n")
+            progress.flush()
+            stats["rows"] += 1
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        stats["seconds"] = time.perf_counter() - start
+        output.close()
+        progress.close()
+    return stats
+
+def harvest(requests_jsonl, output_csv, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+            max_retries=DEFAULT_MAX_RETRIES, base_url=None, api_key=None, overwrite=False):
+    """Synchronous entry point: harvest on a fresh pooled client; returns the run's stats"""
+    async def run():
+        async with create_client(concurrency, base_url, api_key) as client:
+            return await harvest_async(requests_jsonl, output_csv, client, concurrency, rate, max_retries, overwrite)
+    return asyncio.run(run())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate evaluation datasets from model responses")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prepare = commands.add_parser("prepare", help="write batch request JSONL from a prompt list")
+    prepare.add_argument("prompts", help="CSV with prompt and grade_level (and optionally expected_quality) columns")
+    prepare.add_argument("--output", required=True, help="batch request JSONL to write")
+    prepare.add_argument("--model", default=DEFAULT_MODEL, help=f"model to ask (default: {DEFAULT_MODEL})")
+    prepare.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                         help=f"longest response, in tokens (default: {DEFAULT_MAX_TOKENS})")
+
+    run = commands.add_parser("run", help="send batch requests and stream responses into a dataset CSV")
+    run.add_argument("requests", help="batch request JSONL from the prepare step")
+    run.add_argument("--output", required=True, help="dataset CSV to write (resumed if a previous run stopped)")
+    run.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                     help=f"most calls in flight at once (default: {DEFAULT_CONCURRENCY})")
+    run.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                     help=f"most calls started per second (default: {DEFAULT_RATE})")
+    run.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                     help=f"retries per request on rate limits, overload and connection errors (default: {DEFAULT_MAX_RETRIES})")
+    run.add_argument("--base-url", help="API endpoint, e.g. an api_standin.py server")
+    run.add_argument("--overwrite", action="store_true",
+                     help="replace an existing --output CSV that has no progress log to resume from")
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        count = prepare_requests(args.prompts, args.output, args.model, args.max_tokens)
+        print(f"✓ {count} requests written to: {args.output}")
+        return
+
+    if not (args.base_url or os.environ.get("ANTHROPIC_API_KEY")):
+        parser.error("set ANTHROPIC_API_KEY, or point --base-url at a stand-in server")
+    print(f"\n🌾 Harvesting responses for: {args.requests}\n")
+    try:
+        stats = harvest(args.requests, args.output, args.concurrency, args.rate, args.max_retries, args.base_url,
+                        overwrite=args.overwrite)
+    except FileExistsError as error:
+        raise SystemExit(f"❌ {error}")
+    except KeyboardInterrupt:
+        print("\n⚠ Interrupted - run the same command again to resume")
+        raise SystemExit(130)
+    if stats["skipped"]:
+        print(f"Resumed: {stats['skipped']} requests already harvested")
+    for line in call_report(stats, "Responses harvested"):
+        print(line)
+    if stats["failures"]:
+        print(f"⚠ {stats['failures']} requests failed - run the same command again to retry them")
+    print(f"\n✓ Dataset saved to: {args.output}")
+    print(f"  Evaluate it with: python3 evaluate.py {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+LLM Judge - Optional model-graded accuracy and age-appropriateness scores
+Asks a model (through the pinned anthropic client) to grade each response against the
+same rubric dimensions evaluate_response scores with keywords. Calls run concurrently on
+one pooled HTTP client, paced by a token bucket and retried with backoff; every run
+reports calls/sec and latency percentiles. Run api_standin.py to test it offline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from api_client import (
+    DEFAULT_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_RATE, call_report, create_client, create_message,
+    new_call_stats, new_token_bucket,
+)
+from results_io import read_results
+
+DEFAULT_MODEL = "claude-3-5-haiku-20241022"
+
+JUDGE_COLUMNS = ["Test_ID", "Judge_Accuracy", "Judge_Age_Appropriate", "Judge_Rationale", "Judge_Error"]
+
+JUDGE_SYSTEM_PROMPT = """You grade answers an educational chatbot gave to students.
+Score the response on two dimensions, each from 0.0 to 1.0:
+- accuracy: is it factually correct, and does it answer the prompt with the key concepts?
+- age_appropriate: are its vocabulary and complexity right for the student's grade level?
+Reply with only a JSON object: {"accuracy": <score>, "age_appropriate": <score>, "rationale": "<one sentence>"}"""
+
+def judge_message(prompt, response, grade_level):
+    """The user message sent to the judge for one response"""
+    return f"Grade level: {grade_level}\nPrompt: {prompt}\nResponse: {response}"
+
+def parse_judgement(text):
+    """Scores from the judge's reply; raises ValueError if it isn't the JSON asked for"""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError(f"judge reply has no JSON object: {text[:80]!r}")
+    reply = json.loads(match.group(0))
+    return {
+        "accuracy": min(max(float(reply["accuracy"]), 0.0), 1.0),
+        "age_appropriate": min(max(float(reply["age_appropriate"]), 0.0), 1.0),
+        "rationale": str(reply.get("rationale", "")),
+    }
+
+async def _judge_one(client, row, settings, bucket, stats):
+    prompt, response, grade_level = row
+    text = await create_message(
+        client, bucket, stats, settings["max_retries"],
+        model=settings["model"],
+        max_tokens=200,
+        system=JUDGE_SYSTEM_PROMPT,
+        messages=[{"role": "user", "content": judge_message(prompt, response, grade_level)}],
+    )
+    return parse_judgement(text)
+
+async def judge_rows_async(rows, client, model=DEFAULT_MODEL, concurrency=DEFAULT_CONCURRENCY,
+                           rate=DEFAULT_RATE, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    Judge (prompt, response, grade_level) rows with `concurrency` calls in flight at most
+    Returns (judgements, stats); a row whose call failed for good gets {"error": ...}
+    """
+    settings = {"model": model, "max_retries": max_retries}
+    bucket = new_token_bucket(rate)
+    stats = new_call_stats(len(rows))
+    judgements = [None] * len(rows)
+    queue = iter(enumerate(rows))
+
+    # A fixed set of workers pulling rows keeps tasks (and memory) bounded by the concurrency
+    async def worker():
+        for index, row in queue:
+            try:
+                judgements[index] = await _judge_one(client, row, settings, bucket, stats)
+            except Exception as error:
+                stats["failures"] += 1
+                judgements[index] = {"error": f"{type(error).__name__}: {error}"}
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(rows))))))
+    stats["seconds"] = time.perf_counter() - start
+    return judgements, stats
+
+def judge_rows(rows, model=DEFAULT_MODEL, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+               max_retries=DEFAULT_MAX_RETRIES, base_url=None, api_key=None):
+    """Synchronous entry point: judge rows on a fresh pooled client; returns (judgements, stats)"""
+    async def run():
+        async with create_client(concurrency, base_url, api_key) as client:
+            return await judge_rows_async(rows, client, model, concurrency, rate, max_retries)
+    return asyncio.run(run())
+
+def judge_response(prompt, response, grade_level, model=DEFAULT_MODEL, base_url=None, api_key=None):
+    """Judge scores for one response, the model-graded counterpart of evaluate_response"""
+    judgements, _ = judge_rows([(prompt, response, grade_level)], model, 1, DEFAULT_RATE,
+                               DEFAULT_MAX_RETRIES, base_url, api_key)
+    if "error" in judgements[0]:
+        raise RuntimeError(judgements[0]["error"])
+    return judgements[0]
+
+def judge_output_path(results_filename):
+    """Where the judge scores for a results file are written"""
+    return os.path.splitext(results_filename)[0] + "_judge.csv"
+
+def judge_file(results_filename, output=None, limit=None, **options):
+    """
+    Judge the responses in a results file and write Test_ID-keyed judge scores next to it
+    Returns (output path, stats); options are passed on to judge_rows
+    """
+    import pandas as pd
+
+    df = read_results(results_filename, ["Test_ID", "Prompt", "Response", "Grade_Level"])
+    if limit:
+        df = df.head(limit)
+    rows = list(zip(df["Prompt"].astype(str), df["Response"].fillna("").astype(str), df["Grade_Level"].astype(str)))
+    judgements, stats = judge_rows(rows, **options)
+
+    output = output or judge_output_path(results_filename)
+    pd.DataFrame({
+        "Test_ID": df["Test_ID"].to_numpy(),
+        "Judge_Accuracy": [j.get("accuracy") for j in judgements],
+        "Judge_Age_Appropriate": [j.get("age_appropriate") for j in judgements],
+        "Judge_Rationale": [j.get("rationale", "") for j in judgements],
+        "Judge_Error": [j.get("error", "") for j in judgements],
+    }, columns=JUDGE_COLUMNS).to_csv(output, index=False)
+    return output, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score evaluation results with an LLM judge")
+    parser.add_argument("results", help="results file whose responses to judge")
+    parser.add_argument("--output", help="judge scores CSV (default: <results>_judge.csv)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"judge model (default: {DEFAULT_MODEL})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"most calls in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"most calls started per second (default: {DEFAULT_RATE})")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f"retries per row on rate limits, overload and connection errors (default: {DEFAULT_MAX_RETRIES})")
+    parser.add_argument("--limit", type=int, help="judge only the first N rows")
+    parser.add_argument("--base-url", help="API endpoint, e.g. an api_standin.py server")
+    args = parser.parse_args(argv)
+
+    if not (args.base_url or os.environ.get("ANTHROPIC_API_KEY")):
+        parser.error("set ANTHROPIC_API_KEY, or point --base-url at a stand-in server")
+
+    print(f"\n⚖️  Judging: {args.results} with {args.model}\n")
+    output, stats = judge_file(
+        args.results, args.output, args.limit, model=args.model, concurrency=args.concurrency,
+        rate=args.rate, max_retries=args.max_retries, base_url=args.base_url,
+    )
+    for line in call_report(stats, "Rows judged"):
+        print(line)
+    print(f"\n✓ Judge scores saved to: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Load Test - Drives the scoring service (serve.py) with concurrent keep-alive connections
+Requests are built from the bundled prompts/*.csv rows (each response made unique so the
+service's memo can't answer it) and sent either as fast as the service answers or at a
+fixed total rate; latency is measured from when each request was due, so a stalled
+service can't hide its queueing delay. Prints client-side latency percentiles and
+throughput next to the service's own /metrics
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from serve import DEFAULT_HOST, DEFAULT_PORT
+from stats_utils import percentile
+
+DATASET_GLOB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts", "*.csv")
+DEFAULT_CONNECTIONS = 8
+DEFAULT_DURATION = 10.0
+DEFAULT_WARMUP = 1.0
+
+def load_items(pattern=DATASET_GLOB):
+    """prompt/response/grade_level items from the bundled datasets"""
+    items = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                items.append({"prompt": row["prompt"], "response": row["response"], "grade_level": row["grade_level"]})
+    return items
+
+def request_bytes(host, path, payload):
+    body = json.dumps(payload).encode()
+    return (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+async def read_response(reader):
+    """(status, body) of one HTTP response"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return int(lines[0].split(" ")[1]), await reader.readexactly(length)
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        status, body = await read_response(reader)
+        return json.loads(body)
+    finally:
+        writer.close()
+
+async def connection_worker(host, port, items, stats, batch_size, interval, start_at, end_at, warmup_until, counter):
+    """
+    One keep-alive connection sending requests until end_at; with an interval, request n is
+    due at start_at + n * interval (open loop), otherwise each goes as soon as the last is answered
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    path = "/score" if batch_size == 1 else "/score/batch"
+    sent = 0
+    try:
+        while True:
+            due = start_at + sent * interval if interval else time.perf_counter()
+            if due >= end_at:
+                return
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            batch = []
+            for _ in range(batch_size):
+                counter[0] += 1
+                item = items[counter[0] % len(items)]
+                batch.append({**item, "response": f"{item['response']} ({counter[0]})"})
+            payload = batch[0] if batch_size == 1 else {"items": batch}
+            writer.write(request_bytes(host, path, payload))
+            status, _ = await read_response(reader)
+            sent += 1
+            if due < warmup_until:
+                continue
+            stats["latencies"].append(time.perf_counter() - due)
+            stats["requests"] += 1
+            stats["items"] += batch_size
+            if status != 200:
+                stats["errors"] += 1
+    finally:
+        writer.close()
+
+async def run_load(host, port, connections=DEFAULT_CONNECTIONS, rate=0.0, duration=DEFAULT_DURATION,
+                   warmup=DEFAULT_WARMUP, batch_size=1):
+    """Drive the service; returns client-side stats (latencies in seconds, counts, measured seconds)"""
+    items = load_items()
+    stats = {"latencies": [], "requests": 0, "items": 0, "errors": 0}
+    start_at = time.perf_counter()
+    warmup_until = start_at + warmup
+    end_at = warmup_until + duration
+    # Each connection carries an equal share of the rate, staggered so sends interleave
+    interval = connections / rate if rate else 0.0
+    counter = [0]
+    await asyncio.gather(*(
+        connection_worker(host, port, items, stats, batch_size, interval,
+                          start_at + (index * interval / connections if interval else 0.0), end_at, warmup_until, counter)
+        for index in range(connections)
+    ))
+    stats["seconds"] = duration
+    stats["server"] = await get_json(host, port, "/metrics")
+    return stats
+
+def load_report(stats):
+    """Result lines for a load test run"""
+    latencies = stats["latencies"]
+    seconds = stats["seconds"]
+    server = stats["server"]
+    lines = [
+        f"Requests: {stats['requests']} in {seconds:.1f}s ({stats['requests'] / seconds:.0f}/sec), "
+        f"{stats['items']} responses scored ({stats['items'] / seconds:.0f}/sec), {stats['errors']} errors",
+        "Client latency: " + ", ".join(f"p{q} {percentile(latencies, q) * 1000:.2f}ms" for q in (50, 90, 99))
+        + f", max {max(latencies, default=0.0) * 1000:.2f}ms",
+        f"Service: {server['requests']} requests, {server['items_scored']} responses in {server['batches']} batches "
+        f"(mean {server['mean_batch_items']} per batch), scoring {server['scoring_seconds']:.2f}s",
+        "Service latency histogram (ms): " + ", ".join(
+            f"{bound}: {count}" for bound, count in server["latency_ms"]["histogram"].items() if count),
+    ]
+    return lines
+
+def start_local_service(port):
+    """Run serve.py in a child process and wait until it answers; returns the process"""
+    service = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py"),
+                                "--port", str(port)], stdout=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            asyncio.run(get_json(DEFAULT_HOST, port, "/health"))
+            return service
+        except OSError:
+            time.sleep(0.1)
+    service.terminate()
+    raise SystemExit("❌ The scoring service didn't start")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the scoring service")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"service address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"service port (default: {DEFAULT_PORT})")
+    parser.add_argument("--start-service", action="store_true",
+                        help="start serve.py on --port for the test and stop it afterwards")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"concurrent keep-alive connections (default: {DEFAULT_CONNECTIONS})")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="total requests per second to send (default: as fast as the service answers)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help=f"seconds to measure for (default: {DEFAULT_DURATION:g})")
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP,
+                        help=f"seconds of load before measuring (default: {DEFAULT_WARMUP:g})")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="responses per request; above 1, requests go to /score/batch (default: 1)")
+    args = parser.parse_args(argv)
+
+    service = start_local_service(args.port) if args.start_service else None
+    try:
+        mode = f"{args.rate:g} requests/sec" if args.rate else "as fast as answered"
+        print(f"\n🚦 Load test: {args.connections} connections, {mode}, {args.batch_size} responses per request\n")
+        stats = asyncio.run(run_load(args.host, args.port, args.connections, args.rate, args.duration,
+                                     args.warmup, args.batch_size))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+    for line in load_report(stats):
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Near-Duplicate Detection - MinHash + LSH clustering of responses to the same prompt
+Each distinct response gets a MinHash signature of its word 3-gram shingles; signatures
+are cut into bands, and responses to the same prompt and grade level that share a band
+(and agree on at least the threshold share of their signature) join one cluster
+Work is linear in the number of responses: no pair of responses is ever compared
+unless LSH already put them in the same bucket. Clusters carry across chunks, so a
+streamed run clusters the whole file
+"""
+
+from rubrics import describe_issue_codes
+from score_cache import RATING_LABELS
+
+NUM_PERM = 64
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+# Estimated Jaccard similarity of shingles at which two responses count as near-duplicates
+DEFAULT_THRESHOLD = 0.8
+SEED = 20240517
+
+def _constants():
+    """Fixed random multipliers for the MinHash permutations and band keys (same in every process)"""
+    import numpy as np
+
+    rng = np.random.default_rng(SEED)
+    odd = lambda size: rng.integers(1, 2 ** 63, size=size, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    return {
+        "perm_a": odd(NUM_PERM),
+        "perm_b": rng.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64),
+        "shingle": odd(SHINGLE_WORDS),
+        "band": odd(ROWS_PER_BAND + 1),
+    }
+
+def new_dedupe_index(threshold=DEFAULT_THRESHOLD, score_representatives=False):
+    """
+    Empty cluster index for a run; returns the state passed to cluster_chunk / expand_scores
+    With score_representatives, only the first response of each cluster is scored and
+    the rest of the cluster reuses its scores
+    """
+    import numpy as np
+
+    return {
+        "threshold": threshold,
+        "score_representatives": score_representatives,
+        "constants": _constants(),
+        # Band keys of every cluster representative, kept sorted per band, and the slot they point to
+        "band_keys": [np.empty(0, dtype=np.uint64) for _ in range(BANDS)],
+        "band_slots": [np.empty(0, dtype=np.int64) for _ in range(BANDS)],
+        # Per slot: the representative's signature, cluster ID and (once scored) scores
+        "signatures": np.empty((0, NUM_PERM), dtype=np.uint32),
+        "cluster_ids": np.empty(0, dtype=np.int64),
+        "quality": np.empty(0, dtype=float),
+        "rating": np.empty(0, dtype=np.uint8),
+        "issue_codes": np.empty(0, dtype=np.int64),
+        "rows": 0,
+        "scored": 0,
+    }
+
+def _hash_strings(values, key):
+    import pandas as pd
+
+    return pd.util.hash_array(values.astype(object), hash_key=key, categorize=False)
+
+def minhash_signatures(texts, constants=None):
+    """
+    MinHash signatures (one row of NUM_PERM uint32 values per text) of normalized texts'
+    word 3-gram shingles; texts with fewer than three words are one shingle
+    """
+    import numpy as np
+
+    constants = constants or _constants()
+    tokens = [text.split() for text in texts]
+    lengths = np.fromiter((len(row) for row in tokens), dtype=np.int64, count=len(tokens))
+    flat = np.array([token for row in tokens for token in row], dtype=object)
+    token_hashes = _hash_strings(flat, "minhash-tokens00")
+    owner = np.repeat(np.arange(len(tokens)), lengths)
+
+    # A shingle starts at every token with SHINGLE_WORDS - 1 more tokens of the same text after it
+    shingles = len(flat) - SHINGLE_WORDS + 1
+    if shingles > 0:
+        starts = np.flatnonzero(owner[:shingles] == owner[SHINGLE_WORDS - 1:])
+    else:
+        starts = np.empty(0, dtype=np.int64)
+    shingle_hashes = np.zeros(len(starts), dtype=np.uint64)
+    for offset in range(SHINGLE_WORDS):
+        shingle_hashes += token_hashes[starts + offset] * constants["shingle"][offset]
+    shingle_owner = owner[starts]
+
+    # Short texts: the whole text is the one shingle
+    short = np.flatnonzero(lengths < SHINGLE_WORDS)
+    if len(short):
+        short_hashes = _hash_strings(np.array([" ".join(tokens[i]) for i in short], dtype=object), "minhash-shorts00")
+        shingle_hashes = np.concatenate([shingle_hashes, short_hashes])
+        shingle_owner = np.concatenate([shingle_owner, short])
+
+    order = np.argsort(shingle_owner, kind="stable")
+    shingle_hashes = shingle_hashes[order]
+    boundaries = np.flatnonzero(np.r_[True, shingle_owner[order][1:] != shingle_owner[order][:-1]])
+
+    # Multiply-shift hashing: each permutation maps a shingle hash to its top 32 bits
+    signatures = np.empty((len(tokens), NUM_PERM), dtype=np.uint32)
+    if not len(tokens):
+        return signatures
+    for perm in range(NUM_PERM):
+        permuted = (shingle_hashes * constants["perm_a"][perm] + constants["perm_b"][perm]) >> np.uint64(32)
+        signatures[:, perm] = np.minimum.reduceat(permuted, boundaries)
+    return signatures
+
+def band_keys(signatures, scopes, constants=None):
+    """One 64-bit LSH bucket key per band of each signature, salted with its scope (prompt and grade)"""
+    import numpy as np
+
+    constants = constants or _constants()
+    keys = np.empty((len(signatures), BANDS), dtype=np.uint64)
+    for band in range(BANDS):
+        key = scopes * constants["band"][ROWS_PER_BAND]
+        for row in range(ROWS_PER_BAND):
+            key += signatures[:, band * ROWS_PER_BAND + row].astype(np.uint64) * constants["band"][row]
+        keys[:, band] = key
+    return keys
+
+def _similar(signatures, other, threshold):
+    """Whether each signature agrees with its counterpart on at least threshold of positions"""
+    return (signatures == other).mean(axis=1) >= threshold
+
+def _match_index(index, keys, signatures):
+    """Slot of an earlier cluster each signature belongs to, or -1"""
+    import numpy as np
+
+    slots = np.full(len(keys), -1, dtype=np.int64)
+    for band in range(BANDS):
+        stored = index["band_keys"][band]
+        open_rows = np.flatnonzero(slots < 0)
+        if not len(stored) or not len(open_rows):
+            break
+        position = np.searchsorted(stored, keys[open_rows, band])
+        found = position < len(stored)
+        found[found] = stored[position[found]] == keys[open_rows[found], band]
+        candidates = open_rows[found]
+        candidate_slots = index["band_slots"][band][position[found]]
+        close = _similar(signatures[candidates], index["signatures"][candidate_slots], index["threshold"])
+        slots[candidates[close]] = candidate_slots[close]
+    return slots
+
+def _bucket_minimum(labels, order, starts):
+    """Smallest label in each item's bucket, given the items' bucket-sorted order and bucket starts"""
+    import numpy as np
+
+    lowest = np.empty_like(labels)
+    sizes = np.diff(np.append(starts, len(order)))
+    lowest[order] = np.repeat(np.minimum.reduceat(labels[order], starts), sizes)
+    return lowest
+
+def _cluster_within(keys, signatures, threshold):
+    """
+    Cluster head (an index into keys) for each item: items sharing a bucket in any band are
+    joined by label propagation, then kept only if similar enough to their head
+    """
+    import numpy as np
+
+    heads = np.arange(len(keys))
+    pending = heads.copy()
+    while len(pending):
+        buckets = []
+        for band in range(BANDS):
+            order = np.argsort(keys[pending, band], kind="stable")
+            sorted_keys = keys[pending[order], band]
+            buckets.append((order, np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])))
+        labels = np.arange(len(pending))
+        changed = True
+        while changed:
+            changed = False
+            for order, starts in buckets:
+                lowest = _bucket_minimum(labels, order, starts)
+                lowest = lowest[lowest]
+                if (lowest < labels).any():
+                    labels = lowest
+                    changed = True
+        heads[pending] = pending[labels]
+        # Chains of buckets can join dissimilar items; those are clustered again among themselves
+        keep = _similar(signatures[pending], signatures[heads[pending]], threshold)
+        pending = pending[~keep]
+    return heads
+
+def cluster_chunk(index, chunk, first_test_id):
+    """
+    Assign each row of a prompt/grade_level/response chunk to a near-duplicate cluster
+    Returns a plan: cluster_id per row (the Test_ID of the cluster's first row), the
+    positions of rows that start new clusters, and for other rows where their scores come from
+    """
+    import numpy as np
+    import pandas as pd
+
+    constants = index["constants"]
+    scope_text = chunk["prompt"].astype(str).str.lower().str.strip() + "\x1f" + chunk["grade_level"].astype(str)
+    scopes = _hash_strings(scope_text.to_numpy(), "minhash-scopes00")
+
+    # Exact duplicates collapse first; only distinct (scope, response) items are normalized and hashed
+    responses = chunk["response"].fillna("").astype(str).to_numpy()
+    item_keys = scopes ^ _hash_strings(responses, "minhash-texts000")
+    item_of_row, _ = pd.factorize(item_keys)
+    first_row = np.unique(item_of_row, return_index=True)[1]
+
+    normalized = [" ".join(text.lower().split()) for text in responses[first_row]]
+    signatures = minhash_signatures(normalized, constants)
+    keys = band_keys(signatures, scopes[first_row], constants)
+
+    # Items close to a cluster from an earlier chunk join it; the rest cluster among themselves
+    slots = _match_index(index, keys, signatures)
+    new = np.flatnonzero(slots < 0)
+    heads = new[_cluster_within(keys[new], signatures[new], index["threshold"])]
+
+    item_cluster = np.empty(len(first_row), dtype=np.int64)
+    earlier = slots >= 0
+    item_cluster[earlier] = index["cluster_ids"][slots[earlier]]
+    item_cluster[new] = first_test_id + first_row[heads]
+
+    # New clusters are added to the index, represented by their first item
+    head_items = np.unique(heads)
+    new_slots = np.arange(len(index["cluster_ids"]), len(index["cluster_ids"]) + len(head_items))
+    index["signatures"] = np.concatenate([index["signatures"], signatures[head_items]])
+    index["cluster_ids"] = np.concatenate([index["cluster_ids"], first_test_id + first_row[head_items]])
+    for band in range(BANDS):
+        order = np.argsort(keys[head_items, band], kind="stable")
+        new_keys = keys[head_items[order], band]
+        position = np.searchsorted(index["band_keys"][band], new_keys)
+        index["band_keys"][band] = np.insert(index["band_keys"][band], position, new_keys)
+        index["band_slots"][band] = np.insert(index["band_slots"][band], position, new_slots[order])
+    for name, dtype in (("quality", float), ("rating", np.uint8), ("issue_codes", np.int64)):
+        index[name] = np.concatenate([index[name], np.zeros(len(head_items), dtype=dtype)])
+
+    cluster_id = item_cluster[item_of_row]
+    representatives = first_row[head_items]
+    # Rows of a cluster started in this chunk take the scores of its first row; rows of
+    # earlier clusters take the scores stored for it
+    row_slot = np.empty(len(first_row), dtype=np.int64)
+    row_slot[earlier] = slots[earlier]
+    row_slot[new] = new_slots[np.searchsorted(head_items, heads)]
+    slot_of_row = row_slot[item_of_row]
+    index["rows"] += len(chunk)
+    return {
+        "cluster_id": cluster_id,
+        "representatives": representatives,
+        "slots": slot_of_row,
+        "new_slots": new_slots,
+    }
+
+def expand_scores(index, plan, representative_scores):
+    """
+    Scores for every row of a clustered chunk from the scores of its new representatives
+    (a SCORE_COLUMNS frame, in plan["representatives"] order); remembers them for later chunks
+    """
+    import numpy as np
+    import pandas as pd
+
+    slots = plan["new_slots"]
+    index["quality"][slots] = representative_scores["Educational_Quality"].to_numpy()
+    index["rating"][slots] = pd.Categorical(representative_scores["Overall_Rating"], categories=RATING_LABELS).codes
+    index["issue_codes"][slots] = representative_scores["Issue_Codes"].to_numpy()
+    index["scored"] += len(slots)
+
+    rows = plan["slots"]
+    codes = index["issue_codes"][rows]
+    distinct, first = np.unique(codes, return_inverse=True)
+    notes = np.array(["; ".join(describe_issue_codes(int(code))) for code in distinct], dtype=object)
+    return pd.DataFrame({
+        "Educational_Quality": index["quality"][rows],
+        "Overall_Rating": np.array(RATING_LABELS, dtype=object)[index["rating"][rows]],
+        "Notes": notes[first],
+        "Issue_Codes": codes,
+    })
+
+def dedupe_report(index):
+    """One-line clustering summary for the end of a run"""
+    clusters = len(index["cluster_ids"])
+    duplicates = index["rows"] - clusters
+    rate = duplicates / index["rows"] * 100 if index["rows"] else 0.0
+    report = f"Near-duplicates: {duplicates} of {index['rows']} rows ({rate:.1f}%) in {clusters} clusters"
+    if index["score_representatives"]:
+        report += f", {index['scored']} representatives scored"
+    return report
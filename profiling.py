@@ -0,0 +1,124 @@
+"""
+Profiling - Optional per-stage and per-rule timing for evaluation and analysis runs
+A profile is a plain dict of wall/CPU seconds per pipeline stage (reading, scoring,
+writing, drawing, ...) and of evaluations, hits and seconds per scoring rule
+Every hook takes profile=None and does nothing when it is None, so an unprofiled run
+only pays a comparison per chunk
+"""
+
+import contextlib
+import json
+import os
+import time
+
+def new_profile():
+    """Empty profile: stages by name, rules by name"""
+    return {"stages": {}, "rules": {}}
+
+def _stage(profile, name):
+    return profile["stages"].setdefault(name, {"seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+
+@contextlib.contextmanager
+def _timed_stage(profile, name):
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        stage = _stage(profile, name)
+        stage["seconds"] += time.perf_counter() - wall
+        stage["cpu_seconds"] += time.process_time() - cpu
+        stage["calls"] += 1
+
+def profile_stage(profile, name):
+    """Context manager timing the code inside it as a pipeline stage (a no-op without a profile)"""
+    if profile is None:
+        return contextlib.nullcontext()
+    return _timed_stage(profile, name)
+
+def profiled_iter(iterable, profile, name):
+    """Yield an iterable's items, timing each fetch as a stage - e.g. parsing the next CSV chunk"""
+    if profile is None:
+        yield from iterable
+        return
+    items = iter(iterable)
+    while True:
+        with _timed_stage(profile, name):
+            item = next(items, None)
+        if item is None:
+            return
+        yield item
+
+def rule_start(profile):
+    """Clock reading to pass to record_rule (skipped without a profile)"""
+    return time.perf_counter() if profile is not None else 0.0
+
+def record_rule(profile, name, started, evaluations, hits):
+    """
+    Record one application of a scoring rule to a batch of rows
+    hits is the number (or a boolean mask) of rows the rule flagged
+    """
+    if profile is None:
+        return
+    seconds = time.perf_counter() - started
+    rule = profile["rules"].setdefault(name, {"evaluations": 0, "hits": 0, "seconds": 0.0})
+    rule["evaluations"] += int(evaluations)
+    rule["hits"] += int(hits.sum()) if hasattr(hits, "sum") else int(hits)
+    rule["seconds"] += seconds
+
+def merge_profiles(profile, other):
+    """Add another profile's stages and rules into profile (e.g. one a worker process returned)"""
+    for name, stage in other["stages"].items():
+        merged = _stage(profile, name)
+        for key in ("seconds", "cpu_seconds", "calls"):
+            merged[key] += stage[key]
+    for name, rule in other["rules"].items():
+        merged = profile["rules"].setdefault(name, {"evaluations": 0, "hits": 0, "seconds": 0.0})
+        for key in ("evaluations", "hits", "seconds"):
+            merged[key] += rule[key]
+    return profile
+
+def profile_path(results_filename, kind="evaluation"):
+    """JSON sidecar a run's profile is saved to, next to its results file"""
+    suffix = "_profile.json" if kind == "evaluation" else f"_{kind}_profile.json"
+    return os.path.splitext(results_filename)[0] + suffix
+
+def write_profile(profile, path, **context):
+    """Save a profile as JSON, with context about the run (results file, rows, workers, ...)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({**context, **profile}, f, indent=1)
+    return path
+
+def profile_report(profile, total_seconds=None):
+    """Summary table lines: stages by time, then rules by time"""
+    stages = sorted(profile["stages"].items(), key=lambda item: -item[1]["seconds"])
+    total = total_seconds or sum(stage["seconds"] for _, stage in stages) or 1.0
+    lines = [f"{'Stage':<22} {'Wall (s)':>10} {'CPU (s)':>10} {'Calls':>8} {'Share':>7}"]
+    for name, stage in stages:
+        lines.append(f"{name:<22} {stage['seconds']:>10.3f} {stage['cpu_seconds']:>10.3f} "
+                     f"{stage['calls']:>8} {stage['seconds'] / total * 100:>6.1f}%")
+
+    rules = sorted(profile["rules"].items(), key=lambda item: -item[1]["seconds"])
+    if rules:
+        lines.append("")
+        lines.append(f"{'Rule':<34} {'Evaluations':>12} {'Hits':>10} {'Seconds':>9} {'µs/row':>8}")
+        for name, rule in rules:
+            per_row = rule["seconds"] / rule["evaluations"] * 1e6 if rule["evaluations"] else 0.0
+            lines.append(f"{name:<34} {rule['evaluations']:>12} {rule['hits']:>10} "
+                         f"{rule['seconds']:>9.3f} {per_row:>8.2f}")
+        score = profile["stages"].get("score")
+        if score:
+            other = score["seconds"] - sum(rule["seconds"] for _, rule in rules)
+            lines.append(f"{'(rating, notes and other scoring)':<34} {'':>12} {'':>10} {max(other, 0.0):>9.3f}")
+    return lines
+
+def report_profile(profile, path, total_seconds, **context):
+    """Print a run's profile table and save it to its JSON sidecar"""
+    print("\n" + "=" * 60)
+    print(f"PROFILE ({total_seconds:.2f}s total)")
+    print("=" * 60)
+    for line in profile_report(profile, total_seconds):
+        print(line)
+    write_profile(profile, path, total_seconds=total_seconds, **context)
+    print(f"\n✓ Profile saved to: {path}")
+    print("=" * 60)
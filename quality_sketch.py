@@ -0,0 +1,141 @@
+"""
+Quality Sketches - Constant-memory summaries of Educational_Quality that merge across runs
+A KLL-style quantile sketch keeps a few hundred of the scores it has seen, each standing
+in for a power-of-two number of them, and answers any percentile within a small rank
+error however many scores went in; a fixed-bin histogram counts scores in 0.05-wide
+bins centred on 0, 0.05, ..., 1. Both are plain dicts of lists, so they are saved in the cached JSON
+summaries, and sketches of different runs (or shards) combine by merging
+"""
+
+import math
+
+# numpy is imported inside the functions that need it
+
+# Items kept at the top level; percentiles come out within about 1% of the true rank
+SKETCH_K = 400
+# Each level holds this share of the items the level above it holds
+LEVEL_SHRINK = 2 / 3
+MIN_LEVEL_CAPACITY = 2
+# Scores are multiples of 0.05, so bins centred on them keep every score off a bin edge
+HISTOGRAM_BINS = 21
+HISTOGRAM_RANGE = (-0.025, 1.025)
+REPORT_PERCENTILES = (50, 90, 99)
+
+def new_sketch(k=SKETCH_K):
+    """
+    Empty quantile sketch: levels[h] holds sorted scores that each stand for 2**h scores,
+    and compactions[h] counts how often level h was halved (which alternates the half kept)
+    """
+    return {"k": k, "n": 0, "min": None, "max": None, "levels": [[]], "compactions": [0]}
+
+def _capacity(k, height, level):
+    return max(MIN_LEVEL_CAPACITY, math.ceil(k * LEVEL_SHRINK ** (height - 1 - level)))
+
+def _compact(sketch, levels):
+    """
+    Halve every level over its capacity, bottom up: pair up its sorted items and promote
+    every other one to the next level at twice the weight, so the total weight never changes
+    """
+    import numpy as np
+
+    level = 0
+    while level < len(levels):
+        items = levels[level]
+        if len(items) > _capacity(sketch["k"], len(levels), level):
+            if level + 1 == len(levels):
+                levels.append(np.empty(0))
+                sketch["compactions"].append(0)
+            paired = len(items) // 2 * 2
+            promoted = items[sketch["compactions"][level] % 2:paired:2]
+            sketch["compactions"][level] += 1
+            levels[level + 1] = np.sort(np.concatenate([levels[level + 1], promoted]))
+            levels[level] = items[paired:]
+        level += 1
+    sketch["levels"] = [items.tolist() for items in levels]
+    return sketch
+
+def sketch_update(sketch, values):
+    """Add an array of scores (NaNs are skipped) to a sketch"""
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return sketch
+    low, high = float(values.min()), float(values.max())
+    sketch["min"] = low if sketch["min"] is None else min(sketch["min"], low)
+    sketch["max"] = high if sketch["max"] is None else max(sketch["max"], high)
+    sketch["n"] += len(values)
+    levels = [np.asarray(items, dtype=float) for items in sketch["levels"]]
+    levels[0] = np.sort(np.concatenate([levels[0], values]))
+    return _compact(sketch, levels)
+
+def sketch_merge(sketch, other):
+    """Fold another sketch (say, another run's) into sketch, level by level"""
+    import numpy as np
+
+    if other["k"] != sketch["k"]:
+        raise ValueError(f"can't merge a sketch with k={other['k']} into one with k={sketch['k']}")
+    if not other["n"]:
+        return sketch
+    for key, pick in (("min", min), ("max", max)):
+        sketch[key] = other[key] if sketch[key] is None else pick(sketch[key], other[key])
+    sketch["n"] += other["n"]
+    levels = [np.asarray(items, dtype=float) for items in sketch["levels"]]
+    for level, items in enumerate(other["levels"]):
+        if level == len(levels):
+            levels.append(np.empty(0))
+            sketch["compactions"].append(0)
+        levels[level] = np.sort(np.concatenate([levels[level], items]))
+    return _compact(sketch, levels)
+
+def sketch_quantile(sketch, q):
+    """
+    The q-th percentile (0-100) of the scores a sketch has seen, nearest-rank, or None
+    when it is empty; exact until the first compaction, within the rank error after it
+    """
+    import numpy as np
+
+    if not sketch["n"]:
+        return None
+    if q <= 0:
+        return sketch["min"]
+    if q >= 100:
+        return sketch["max"]
+    items = np.concatenate([np.asarray(items, dtype=float) for items in sketch["levels"]])
+    weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(sketch["levels"])])
+    order = np.argsort(items, kind="stable")
+    rank = max(1, math.ceil(q / 100 * sketch["n"]))
+    position = np.searchsorted(np.cumsum(weights[order]), rank)
+    return float(items[order][min(position, len(items) - 1)])
+
+def sketch_percentiles(sketch, percentiles=REPORT_PERCENTILES):
+    """{"p50": ..., "p90": ..., "p99": ...} from a sketch"""
+    return {f"p{q}": sketch_quantile(sketch, q) for q in percentiles}
+
+def new_histogram(bins=HISTOGRAM_BINS, low=HISTOGRAM_RANGE[0], high=HISTOGRAM_RANGE[1]):
+    """Empty fixed-bin histogram over [low, high]; scores outside it count in the end bins"""
+    return {"low": low, "high": high, "counts": [0] * bins}
+
+def histogram_update(histogram, values):
+    """Add an array of scores (NaNs are skipped) to a histogram"""
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    values = np.clip(values[~np.isnan(values)], histogram["low"], histogram["high"])
+    counts, _ = np.histogram(values, bins=len(histogram["counts"]), range=(histogram["low"], histogram["high"]))
+    histogram["counts"] = [a + int(b) for a, b in zip(histogram["counts"], counts)]
+    return histogram
+
+def histogram_merge(histogram, other):
+    """Add another histogram's counts to histogram; both need the same bins"""
+    if (other["low"], other["high"], len(other["counts"])) != (histogram["low"], histogram["high"], len(histogram["counts"])):
+        raise ValueError("can't merge histograms with different bins")
+    histogram["counts"] = [a + b for a, b in zip(histogram["counts"], other["counts"])]
+    return histogram
+
+def histogram_edges(histogram):
+    """The len(counts) + 1 bin edges of a histogram"""
+    bins = len(histogram["counts"])
+    width = (histogram["high"] - histogram["low"]) / bins
+    return [histogram["low"] + width * index for index in range(bins + 1)]
@@ -0,0 +1,120 @@
+"""
+Readability Engine - Reading-level metrics for grade-appropriateness checks
+Syllable counts, Flesch-Kincaid grade and the share of rare (three-or-more-syllable)
+words, for one response or a whole column of them at once. Syllables come from a lookup
+table filled once per distinct word, a batch measures each distinct response once, and
+grade labels are parsed once per distinct label
+"""
+
+import functools
+import re
+
+# Words and sentence ends, matched in one pass over a lowercased response
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)*|[.!?]+")
+
+# Words of this many syllables or more count as rare (the Gunning fog "complex word")
+RARE_SYLLABLES = 3
+
+# A response reads too hard for a student when its Flesch-Kincaid grade is more than
+# FK_MARGIN grades above theirs, or its rare-word share is above the grade's ceiling
+FK_MARGIN = 8
+RARE_SHARE_BASE = 0.30
+RARE_SHARE_PER_GRADE = 0.02
+# Below this many words the metrics swing too much to judge a response by
+MIN_WORDS = 30
+
+# Word -> syllables, shared by every call so each distinct word is counted once
+SYLLABLES = {}
+
+def count_syllables(word):
+    """Estimate a lowercase word's syllables from its vowel groups (silent endings dropped)"""
+    if len(word) <= 3:
+        return 1
+    word = re.sub(r"(?:[^laeiouy]es|ed|[^laeiouy]e)$", "", word)
+    word = re.sub(r"^y", "", word)
+    return max(1, len(re.findall(r"[aeiouy]{1,2}", word)))
+
+def syllables(word):
+    """Syllables of a lowercase word, from the lookup table"""
+    count = SYLLABLES.get(word)
+    if count is None:
+        count = SYLLABLES[word] = count_syllables(word)
+    return count
+
+@functools.lru_cache(maxsize=1024)
+def parse_grade_level(grade_level):
+    """Turn a grade label like '5th' or 'K' into a number, or None if it isn't one"""
+    grade_num = str(grade_level).replace("th", "").replace("rd", "").replace("nd", "").replace("st", "").replace("K", "0")
+    return int(grade_num) if grade_num.isdigit() else None
+
+def _metrics(words, sentences, syllable_count, rare_words):
+    """Flesch-Kincaid grade and rare-word share from counts (numbers or numpy arrays alike)"""
+    per_sentence = words / sentences
+    per_word = syllable_count / words
+    return 0.39 * per_sentence + 11.8 * per_word - 15.59, rare_words / words
+
+def _is_sentence_end(token):
+    return token[0] in ".!?"
+
+def readability(text):
+    """Reading-level metrics of one lowercased response"""
+    tokens = TOKEN_PATTERN.findall(text)
+    counts = [syllables(token) for token in tokens if not _is_sentence_end(token)]
+    result = {"words": len(counts), "sentences": max(1, len(tokens) - len(counts)),
+              "syllables": sum(counts), "rare_words": sum(1 for count in counts if count >= RARE_SYLLABLES)}
+    if counts:
+        result["fk_grade"], result["rare_share"] = _metrics(
+            result["words"], result["sentences"], result["syllables"], result["rare_words"])
+    else:
+        result["fk_grade"], result["rare_share"] = 0.0, 0.0
+    return result
+
+def readability_batch(texts):
+    """
+    Reading-level metrics of a column of lowercased responses, as a frame with the
+    same columns as readability(); identical responses are measured once
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, distinct = pd.factorize(texts)
+    tokens = [TOKEN_PATTERN.findall(text) for text in distinct]
+
+    # Every token of every distinct response, tagged with its response; syllables and
+    # sentence ends are looked up once per distinct token, then summed per response
+    lengths = np.fromiter((len(row) for row in tokens), dtype=np.int64, count=len(tokens))
+    owner = np.repeat(np.arange(len(distinct)), lengths)
+    token_codes, vocabulary = pd.factorize(pd.Series([token for row in tokens for token in row], dtype=object))
+    is_end = np.array([_is_sentence_end(token) for token in vocabulary], dtype=bool)
+    table = np.array([0 if end else syllables(token) for token, end in zip(vocabulary, is_end)], dtype=np.int64)
+
+    def per_response(values):
+        return np.bincount(owner, weights=values[token_codes], minlength=len(distinct)).astype(np.int64)
+
+    words = per_response(~is_end)
+    sentences = np.maximum(per_response(is_end), 1)
+    syllable_count = per_response(table)
+    rare_words = per_response(table >= RARE_SYLLABLES)
+
+    fk_grade = np.zeros(len(distinct))
+    rare_share = np.zeros(len(distinct))
+    has_words = words > 0
+    fk_grade[has_words], rare_share[has_words] = _metrics(
+        words[has_words], sentences[has_words], syllable_count[has_words], rare_words[has_words])
+    return pd.DataFrame({
+        "words": words[codes],
+        "sentences": sentences[codes],
+        "syllables": syllable_count[codes],
+        "rare_words": rare_words[codes],
+        "fk_grade": fk_grade[codes],
+        "rare_share": rare_share[codes],
+    })
+
+def reading_level_too_high(words, fk_grade, rare_share, grade_num):
+    """
+    Whether text reads too hard for a grade - works on numbers or numpy arrays alike
+    (pass NaN as the grade where it is unknown; those are never flagged)
+    """
+    return (words >= MIN_WORDS) & (
+        (fk_grade > grade_num + FK_MARGIN) | (rare_share > RARE_SHARE_BASE + RARE_SHARE_PER_GRADE * grade_num)
+    )
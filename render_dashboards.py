@@ -0,0 +1,221 @@
+"""
+Dashboard Renderer - Draws evaluation and analysis dashboard images as a stage of its own
+Each image is keyed by a hash of the results content it shows plus the summary and chart
+code that draw it; images whose key hasn't changed are skipped. evaluate.py starts this in the
+background after a run, and --all re-renders every run's images across a process pool
+"""
+
+import argparse
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from results_io import file_hash
+from run_registry import RESULTS_DIR, connect_registry, list_runs, update_run
+
+# evaluate, analyze_patterns and matplotlib are imported inside the functions that
+# draw, so checking whether an image is up to date costs only a file hash
+
+# Render keys of the images in a dashboards directory, by image file name
+RENDER_MANIFEST = 'render_manifest.json'
+RENDER_LOG = 'render.log'
+KINDS = ('evaluation', 'analysis')
+
+def _chart(kind):
+    """(chart function, image path function) for a dashboard kind"""
+    if kind == 'evaluation':
+        from evaluate import create_dashboard, dashboard_path
+        return create_dashboard, dashboard_path
+    from analyze_patterns import analysis_dashboard_path, create_analysis_dashboard
+    return create_analysis_dashboard, analysis_dashboard_path
+
+def image_path(kind, label):
+    """Image file a dashboard of this kind is saved to, for a results file or combined-runs label"""
+    return _chart(kind)[1](label)
+
+def _summary_code():
+    """
+    Source of the code that turns results into the summaries both kinds of image are drawn
+    from (analyze_patterns' aggregation and the quality sketches), with the summary version
+    """
+    import analyze_patterns
+    import quality_sketch
+
+    functions = (analyze_patterns.empty_summary, analyze_patterns.count_issue_codes, analyze_patterns.exact_sum,
+                 analyze_patterns.prompt_topic, analyze_patterns.group_sketches, analyze_patterns.summarize_results,
+                 analyze_patterns.merge_summaries)
+    return "\n".join([str(analyze_patterns.SUMMARY_VERSION), inspect.getsource(quality_sketch)]
+                     + [inspect.getsource(function) for function in functions])
+
+def render_key(kind, results_files):
+    """
+    Hash of everything an image depends on: its results content, the code that summarizes
+    the results and the code that charts the summary
+    """
+    from importlib.metadata import version
+
+    digest = hashlib.sha256()
+    digest.update(kind.encode())
+    digest.update(_summary_code().encode())
+    digest.update(inspect.getsource(_chart(kind)[0]).encode())
+    digest.update(version('matplotlib').encode())
+    for results_file in results_files:
+        digest.update(file_hash(results_file).encode())
+    return digest.hexdigest()
+
+def _manifest_path(image):
+    return os.path.join(os.path.dirname(image) or '.', RENDER_MANIFEST)
+
+def load_manifest(image):
+    """Render keys recorded next to an image"""
+    try:
+        with open(_manifest_path(image)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def is_current(image, key):
+    return os.path.exists(image) and load_manifest(image).get(os.path.basename(image)) == key
+
+def record_render(image, key):
+    """Remember the key an image was drawn from"""
+    manifest = load_manifest(image)
+    manifest[os.path.basename(image)] = key
+    manifest_path = _manifest_path(image)
+    temp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+def _draw_evaluation(results_file):
+    from analyze_patterns import load_summary
+    from evaluate import create_dashboard
+
+    # Drawn from the cached summary (counts, histogram and quantile sketches), never the raw scores
+    return create_dashboard(load_summary(results_file), results_file)
+
+def _draw_analysis(results_files, label, summary=None):
+    from analyze_patterns import create_analysis_dashboard, load_summary, merge_summaries
+
+    if summary is None:
+        summary = merge_summaries([load_summary(f) for f in results_files])
+    return create_analysis_dashboard(summary, label)
+
+def render(kind, results_files, label=None, summary=None, force=False, quiet=False):
+    """
+    Draw one dashboard image unless it is already current; returns a dict with the
+    image path (None if drawing failed), its key, whether it was drawn, and the seconds taken
+    label names the image (default: the single results file); summary lets the analyzer
+    pass aggregates it already has
+    """
+    label = label or results_files[0]
+    image = image_path(kind, label)
+    key = render_key(kind, results_files)
+    if not force and is_current(image, key):
+        return {"kind": kind, "image": image, "key": key, "drawn": False, "seconds": 0.0}
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(image) or '.', exist_ok=True)
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        if kind == 'evaluation':
+            image = _draw_evaluation(results_files[0])
+        else:
+            image = _draw_analysis(results_files, label, summary)
+    return {"kind": kind, "image": image, "key": key, "drawn": True, "seconds": time.perf_counter() - start}
+
+def _render_job(job):
+    kind, results_file, run_id, force = job
+    result = render(kind, [results_file], force=force, quiet=True)
+    result["run_id"] = run_id
+    return result
+
+def finish_render(result, registry=None, run_id=None):
+    """Record a render: its key in the manifest and, for run dashboards, its path in the registry"""
+    if result["drawn"] and result["image"]:
+        record_render(result["image"], result["key"])
+    if registry is not None and run_id is not None and result["kind"] == 'evaluation' and result["image"]:
+        update_run(registry, run_id, dashboard_path=result["image"], dashboard_seconds=result["seconds"])
+
+def start_background_render(results_file, run_id=None):
+    """
+    Render a run's evaluation dashboard in a detached process and return at once
+    Returns the image path it will be written to; progress goes to render.log beside it
+    """
+    image = image_path('evaluation', results_file)
+    log_dir = os.path.dirname(image) or '.'
+    os.makedirs(log_dir, exist_ok=True)
+    command = [sys.executable, os.path.abspath(__file__), results_file]
+    if run_id is not None:
+        command += ['--run-id', str(run_id)]
+    with open(os.path.join(log_dir, RENDER_LOG), 'a') as log:
+        subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                         start_new_session=True)
+    return image
+
+def all_render_jobs(force=False):
+    """Every finished run's evaluation dashboard, plus the analysis dashboards already drawn for runs"""
+    runs = list_runs(connect_registry()) if os.path.exists(RESULTS_DIR) else []
+    jobs = []
+    for run in runs:
+        results_file = run['results_path']
+        if not results_file or not os.path.exists(results_file):
+            continue
+        jobs.append(('evaluation', results_file, run['run_id'], force))
+        if os.path.exists(image_path('analysis', results_file)):
+            jobs.append(('analysis', results_file, run['run_id'], force))
+    return jobs
+
+def render_all(workers=None, force=False):
+    """Re-render every dashboard whose results or chart code changed, across a process pool"""
+    jobs = all_render_jobs(force)
+    registry = connect_registry() if jobs else None
+    drawn = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_render_job, jobs):
+            finish_render(result, registry, result["run_id"])
+            if result["drawn"]:
+                drawn += 1
+                status = f"drawn in {result['seconds']:.2f}s" if result["image"] else "FAILED"
+                print(f"  {result['kind']:<10} {result['image'] or '-'}: {status}")
+    print(f"✓ {drawn} of {len(jobs)} dashboards re-rendered ({len(jobs) - drawn} already current)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render evaluation and analysis dashboard images")
+    parser.add_argument("results", nargs="*",
+                        help="results files to render dashboards for")
+    parser.add_argument("--kind", choices=KINDS, default="evaluation",
+                        help="which dashboard to render for the given results files (default: evaluation)")
+    parser.add_argument("--run-id", type=int,
+                        help="run registry ID of a single results file, to record its dashboard path")
+    parser.add_argument("--all", action="store_true",
+                        help="re-render the dashboards of every finished run")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes for --all (0 = one per CPU)")
+    parser.add_argument("--force", action="store_true",
+                        help="redraw even when an image is already current")
+    args = parser.parse_args(argv)
+
+    if args.all:
+        render_all(args.workers or None, args.force)
+        return
+    if not args.results:
+        parser.error("give results files to render, or --all")
+    if args.run_id is not None and len(args.results) > 1:
+        parser.error("--run-id needs exactly one results file")
+
+    registry = connect_registry() if args.run_id is not None else None
+    for results_file in args.results:
+        result = render(args.kind, [results_file], force=args.force)
+        finish_render(result, registry, args.run_id)
+        if not result["drawn"]:
+            print(f"✓ {result['image']} is current, not redrawn")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Results Storage - Writes and reads evaluation results as CSV or Parquet
+The format is picked from the file extension; Parquet stores prompts, grade levels
+and ratings dictionary-encoded and lets readers load only the columns they need
+"""
+
+import hashlib
+import os
+
+RESULTS_FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+# Columns of an input dataset, as evaluate.py reads it and harvest.py writes it
+DATASET_COLUMNS = ["prompt", "grade_level", "response", "expected_quality"]
+
+def _results_schema(cluster_ids=False):
+    import pyarrow as pa
+
+    text = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        ("Test_ID", pa.int64()),
+        ("Prompt", text),
+        ("Response", pa.string()),
+        ("Grade_Level", text),
+        ("Expected_Quality", text),
+        ("Educational_Quality", pa.float64()),
+        ("Overall_Rating", text),
+        ("Matches_Expected", pa.bool_()),
+        ("Notes", text),
+        ("Issue_Codes", pa.int64()),
+    ]
+    # Runs with near-duplicate detection record each row's cluster
+    if cluster_ids:
+        fields.append(("Cluster_ID", pa.int64()))
+    return pa.schema(fields)
+
+def file_hash(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def is_parquet(results_filename):
+    return os.path.splitext(results_filename)[1].lower() == ".parquet"
+
+def open_results(results_filename):
+    """Start a results file; returns the writer state passed to append_results / close_results"""
+    return {"path": results_filename, "rows": 0, "parquet": None}
+
+def append_results(writer, results):
+    """Append one frame of evaluation results to the file"""
+    if is_parquet(writer["path"]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _results_schema("Cluster_ID" in results.columns)
+        # Grade labels can be parsed as numbers in some chunks, so pin every column's type
+        table = pa.Table.from_pandas(results.astype({"Grade_Level": str}), schema=schema, preserve_index=False)
+        if writer["parquet"] is None:
+            writer["parquet"] = pq.ParquetWriter(writer["path"], schema, compression="zstd")
+        writer["parquet"].write_table(table)
+    else:
+        append = writer["rows"] > 0
+        results.to_csv(writer["path"], mode="a" if append else "w", header=not append, index=False)
+    writer["rows"] += len(results)
+
+def close_results(writer):
+    """Finish the results file"""
+    if writer["parquet"] is not None:
+        writer["parquet"].close()
+        writer["parquet"] = None
+
+def read_results(results_filename, columns=None):
+    """
+    Load a results file into a DataFrame
+    columns is a list of column names, or a predicate on the column name; only
+    those columns are read (Parquet skips the others entirely)
+    """
+    import pandas as pd
+
+    if not is_parquet(results_filename):
+        return pd.read_csv(results_filename, usecols=columns)
+
+    if callable(columns):
+        import pyarrow.parquet as pq
+        columns = [name for name in pq.read_schema(results_filename).names if columns(name)]
+    df = pd.read_parquet(results_filename, columns=columns)
+
+    # Dictionary columns come back as categoricals; sort their categories so groupby
+    # and value ordering match what the same results give when read from CSV
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].cat.set_categories(sorted(df[name].cat.categories))
+    return df
@@ -0,0 +1,273 @@
+"""
+Rubric Registry - Declarative lexicons and accuracy rubrics for educational prompts
+Each rubric lists the prompt terms that route to it and the response terms it expects
+"""
+
+import hashlib
+import json
+from scanner import build_scanner
+
+# VERY inappropriate language (only major red flags for conversational tone)
+INAPPROPRIATE_WORDS = ["hate", "stupid", "dumb", "useless", "pointless"]
+
+# Vocabulary too advanced for younger grades
+COMPLEX_WORDS = ["ubiquitous", "ephemeral", "deoxyribonucleic", "pragmatic", "paradoxical"]
+
+# Safety keywords - critical for educational content (only severe issues)
+UNSAFE_KEYWORDS = ["violent", "harmful", "dangerous"]
+
+# Issue codes - stable bit assignments for the Issue_Codes results column. Never renumber
+# these; add new issues on unused bits so older results files keep decoding correctly
+ISSUE_INAPPROPRIATE = 1 << 0
+ISSUE_TOO_BRIEF = 1 << 1
+ISSUE_ADVANCED_VOCABULARY = 1 << 2
+ISSUE_SAFETY = 1 << 3
+# A topic rubric was missed; the missed rubric's code is stored from TOPIC_CODE_SHIFT up
+ISSUE_MISSING_CONCEPTS = 1 << 4
+ISSUE_READING_LEVEL = 1 << 5
+TOPIC_CODE_SHIFT = 8
+
+# Note text for each issue bit, in the order notes are recorded
+ISSUE_NOTES = {
+    ISSUE_INAPPROPRIATE: "Response contains inappropriate language",
+    ISSUE_TOO_BRIEF: "Response too brief - lacks detail",
+    ISSUE_ADVANCED_VOCABULARY: "Vocabulary too advanced for grade level",
+    ISSUE_READING_LEVEL: "Reading level too high for grade level",
+    ISSUE_SAFETY: "SAFETY CONCERN - content flagged for review",
+}
+NO_ISSUES_NOTE = "Response meets quality standards"
+
+# Rubrics are checked in order: the first rubric whose trigger matches the prompt wins.
+#   code     - stable topic number recorded in Issue_Codes when the rubric is missed
+#   triggers - list of clauses; a clause matches when ALL of its terms appear in the prompt,
+#              and the rubric matches when ANY clause does
+#   required - terms that must ALL appear in the response
+#   any_of   - at least one of these terms must appear in the response (ignored when empty)
+#   penalty  - accuracy / educational quality assigned when the response misses the rubric
+#   note     - note recorded when the response misses the rubric
+TOPIC_RUBRICS = [
+    {
+        "topic": "photosynthesis",
+        "code": 1,
+        "triggers": [["photosynthesis"]],
+        "required": ["plant"],
+        "any_of": ["energy", "glucose"],
+        "penalty": 0.4,
+        "note": "Response missing key concepts about photosynthesis",
+    },
+    {
+        "topic": "water cycle",
+        "code": 2,
+        "triggers": [["water cycle"]],
+        "required": ["evaporation", "condensation"],
+        "any_of": [],
+        "penalty": 0.5,
+        "note": "Response incomplete - missing cycle stages",
+    },
+    {
+        "topic": "gravity",
+        "code": 3,
+        "triggers": [["gravity"]],
+        "required": ["force", "pull"],
+        "any_of": [],
+        "penalty": 0.4,
+        "note": "Response lacks clear explanation of gravity",
+    },
+    {
+        "topic": "fractions",
+        "code": 4,
+        "triggers": [["fraction"]],
+        "required": ["/"],
+        "any_of": [],
+        "penalty": 0.3,
+        "note": "Response doesn't properly explain fractions",
+    },
+    {
+        "topic": "seasons",
+        "code": 5,
+        "triggers": [["season"]],
+        "required": [],
+        "any_of": ["tilt", "axis"],
+        "penalty": 0.4,
+        "note": "Response missing explanation of Earth's tilt",
+    },
+    {
+        "topic": "moon phases",
+        "code": 6,
+        "triggers": [["moon"]],
+        "required": ["phase"],
+        "any_of": ["orbit", "light"],
+        "penalty": 0.4,
+        "note": "Response lacks understanding of moon phases",
+    },
+    {
+        "topic": "metamorphosis",
+        "code": 7,
+        "triggers": [["metamorphosis"]],
+        "required": ["change"],
+        "any_of": ["caterpillar", "tadpole"],
+        "penalty": 0.4,
+        "note": "Response missing details about metamorphosis",
+    },
+    {
+        "topic": "digestive system",
+        "code": 8,
+        "triggers": [["digestive"]],
+        "required": ["stomach", "intestine"],
+        "any_of": [],
+        "penalty": 0.4,
+        "note": "Response incomplete about digestive system",
+    },
+    {
+        "topic": "rock cycle",
+        "code": 9,
+        "triggers": [["rock", "cycle"]],
+        "required": [],
+        "any_of": ["igneous", "sedimentary"],
+        "penalty": 0.4,
+        "note": "Response missing rock cycle stages",
+    },
+    {
+        "topic": "renewable energy",
+        "code": 10,
+        "triggers": [["renewable"], ["energy"]],
+        "required": [],
+        "any_of": ["solar", "wind", "hydro"],
+        "penalty": 0.4,
+        "note": "Response lacks examples of renewable energy",
+    },
+    {
+        "topic": "ecosystems",
+        "code": 11,
+        "triggers": [["ecosystem"]],
+        "required": ["community", "environment"],
+        "any_of": [],
+        "penalty": 0.4,
+        "note": "Response missing ecosystem components",
+    },
+    {
+        "topic": "natural selection",
+        "code": 12,
+        "triggers": [["natural selection"]],
+        "required": ["adapt"],
+        "any_of": ["survive", "environment"],
+        "penalty": 0.4,
+        "note": "Response lacks explanation of natural selection",
+    },
+    {
+        "topic": "symbiosis",
+        "code": 13,
+        "triggers": [["symbiosis"]],
+        "required": ["relationship"],
+        "any_of": ["species", "benefit"],
+        "penalty": 0.4,
+        "note": "Response incomplete about symbiosis",
+    },
+    {
+        "topic": "decomposition",
+        "code": 14,
+        "triggers": [["decomposition"]],
+        "required": ["bacteria"],
+        "any_of": ["nutrient", "break"],
+        "penalty": 0.4,
+        "note": "Response missing decomposition details",
+    },
+    {
+        "topic": "predator-prey",
+        "code": 15,
+        "triggers": [["predator"], ["prey"]],
+        "required": ["hunt", "eat"],
+        "any_of": [],
+        "penalty": 0.4,
+        "note": "Response lacks clarity on predator-prey relationship",
+    },
+]
+
+def issue_code(rubric):
+    """Issue_Codes bits recorded when a response misses a rubric"""
+    return ISSUE_MISSING_CONCEPTS | (rubric["code"] << TOPIC_CODE_SHIFT)
+
+def describe_issue_codes(code):
+    """Turn an Issue_Codes value back into its notes, in the order the evaluator writes them"""
+    notes = [note for bit, note in ISSUE_NOTES.items() if code & bit]
+    if code & ISSUE_MISSING_CONCEPTS:
+        notes.append(RUBRICS_BY_CODE[code >> TOPIC_CODE_SHIFT]["note"])
+    return notes or [NO_ISSUES_NOTE]
+
+def compile_rubric_index(rubrics):
+    """
+    Build an inverted index from prompt trigger terms to candidate rubrics
+    Each trigger clause is filed under its first term; the remaining terms are
+    verified only for the handful of candidates a prompt actually hits
+    """
+    terms = {}
+    for priority, rubric in enumerate(rubrics):
+        for clause in rubric["triggers"]:
+            terms.setdefault(clause[0].lower(), []).append((priority, [t.lower() for t in clause]))
+
+    return {
+        "rubrics": rubrics,
+        "terms": terms,
+        "lengths": sorted({len(term) for term in terms}),
+    }
+
+def match_rubric(prompt_lower, index):
+    """
+    Return the first rubric (in registry order) whose trigger matches the prompt, or None
+    Triggers are substring matches, so every prompt window with a trigger-term length
+    is looked up in the index - cost depends on prompt length, not on the number of rubrics
+    """
+    terms = index["terms"]
+    candidates = []
+    for start in range(len(prompt_lower)):
+        for length in index["lengths"]:
+            if start + length > len(prompt_lower):
+                break
+            hits = terms.get(prompt_lower[start:start + length])
+            if hits:
+                candidates.extend(hits)
+
+    for priority, clause in sorted(candidates):
+        if all(term in prompt_lower for term in clause[1:]):
+            return index["rubrics"][priority]
+    return None
+
+def rubric_passes(rubric, response_terms):
+    """
+    Check whether a response covers the concepts a rubric expects
+    response_terms is the lowercased response, or the set of topic terms scanned from it
+    """
+    if not all(term in response_terms for term in rubric["required"]):
+        return False
+    return not rubric["any_of"] or any(term in response_terms for term in rubric["any_of"])
+
+def build_response_scanner(rubrics):
+    """Compile the safety, language and vocabulary lexicons plus every rubric's response terms"""
+    topic_terms = sorted({term for rubric in rubrics for term in rubric["required"] + rubric["any_of"]})
+    return build_scanner({
+        "inappropriate": INAPPROPRIATE_WORDS,
+        "complex": COMPLEX_WORDS,
+        "unsafe": UNSAFE_KEYWORDS,
+        "topic": topic_terms,
+    })
+
+def build_safety_scanner():
+    """Compile just the lexicons a streamed response is gated on: inappropriate language and unsafe keywords"""
+    return build_scanner({
+        "inappropriate": INAPPROPRIATE_WORDS,
+        "unsafe": UNSAFE_KEYWORDS,
+    })
+
+def rubric_version():
+    """Fingerprint of every lexicon, issue note and rubric - changes whenever any of them does"""
+    content = json.dumps([
+        INAPPROPRIATE_WORDS, COMPLEX_WORDS, UNSAFE_KEYWORDS,
+        sorted(ISSUE_NOTES.items()), NO_ISSUES_NOTE, TOPIC_RUBRICS,
+    ], sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+# Compiled once at import so each prompt lookup only pays for the index probes
+RUBRIC_INDEX = compile_rubric_index(TOPIC_RUBRICS)
+RUBRICS_BY_CODE = {rubric["code"]: rubric for rubric in TOPIC_RUBRICS}
+RESPONSE_SCANNER = build_response_scanner(TOPIC_RUBRICS)
+SAFETY_SCANNER = build_safety_scanner()
@@ -0,0 +1,197 @@
+"""
+Run Registry - Embedded SQLite record of every evaluation run
+Allocates run IDs atomically (so concurrent evaluations never share a results file)
+and answers "latest run" / "all runs" with an indexed query instead of a directory scan
+Finished runs also keep their summary metrics (per run and per grade), which makes the
+registry a trend store: cross-run history comes from these rows, never the results files
+"""
+
+import os
+import re
+import sqlite3
+import time
+
+RESULTS_DIR = 'results'
+REGISTRY_PATH = os.path.join(RESULTS_DIR, 'runs.db')
+
+SCHEMA = """
+CREATE TABLE runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL DEFAULT 'running',
+    dataset TEXT,
+    results_path TEXT,
+    dashboard_path TEXT,
+    started_at REAL,
+    finished_at REAL,
+    eval_seconds REAL,
+    dashboard_seconds REAL,
+    row_count INTEGER,
+    excellent INTEGER,
+    good INTEGER,
+    needs_review INTEGER,
+    poor INTEGER,
+    safety_issues INTEGER,
+    matches INTEGER,
+    quality_sum REAL
+);
+CREATE INDEX runs_by_status ON runs (status, run_id);
+"""
+
+# Tables and columns added after the first registry release; applied on connect so
+# registries created by older versions pick them up
+MIGRATIONS = """
+CREATE TABLE IF NOT EXISTS run_grades (
+    run_id INTEGER NOT NULL,
+    grade_level TEXT NOT NULL,
+    quality_sum REAL,
+    quality_min REAL,
+    quality_max REAL,
+    row_count INTEGER,
+    PRIMARY KEY (run_id, grade_level)
+) WITHOUT ROWID
+"""
+ADDED_COLUMNS = {"quality_sum": "REAL"}
+
+# Summary keys (see evaluate.new_summary) and the run columns they are stored in
+SUMMARY_COLUMNS = {
+    "total": "row_count",
+    "Excellent": "excellent",
+    "Good": "good",
+    "Needs Review": "needs_review",
+    "Poor": "poor",
+    "safety_issues": "safety_issues",
+    "matches": "matches",
+    "quality_sum": "quality_sum",
+}
+
+# The runs the Trends tab charts: the latest finished runs that recorded summary metrics
+TREND_RUNS = """
+    WHERE status = 'finished' AND row_count > 0 AND quality_sum IS NOT NULL
+    ORDER BY run_id DESC LIMIT ?
+"""
+
+def _import_existing_results(conn, results_dir):
+    """Register results_N files written before the registry existed, keeping their numbers"""
+    for name in sorted(os.listdir(results_dir)):
+        match = re.fullmatch(r'results_(\d+)\.(csv|parquet)', name)
+        if match:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, status, results_path) VALUES (?, 'finished', ?)",
+                (int(match.group(1)), os.path.join(results_dir, name))
+            )
+
+def connect_registry(path=REGISTRY_PATH):
+    """Open (creating on first use) the run registry"""
+    results_dir = os.path.dirname(path) or '.'
+    os.makedirs(results_dir, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+
+    # Create the schema under a write lock so two first-time runs can't both do it
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'runs'"
+        ).fetchone()
+        if not exists:
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            _import_existing_results(conn, results_dir)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}
+        for name, kind in ADDED_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE runs ADD COLUMN {name} {kind}")
+        for statement in MIGRATIONS.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return conn
+
+def allocate_run(conn, dataset, results_path=None, extension=".csv", results_dir=RESULTS_DIR):
+    """
+    Atomically reserve the next run ID and return (run_id, results_path)
+    Without an explicit results_path the run writes results/results_<run_id><extension>
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        run_id = conn.execute(
+            "INSERT INTO runs (dataset, started_at) VALUES (?, ?)", (dataset, time.time())
+        ).lastrowid
+        if results_path is None:
+            results_path = os.path.join(results_dir, f'results_{run_id}{extension}')
+        conn.execute("UPDATE runs SET results_path = ? WHERE run_id = ?", (results_path, run_id))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return run_id, results_path
+
+def update_run(conn, run_id, **fields):
+    """Set columns on a run row"""
+    if fields:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn.execute(f"UPDATE runs SET {assignments} WHERE run_id = ?", (*fields.values(), run_id))
+
+def finish_run(conn, run_id, summary, eval_seconds):
+    """Mark a run finished and store its summary counts, per-grade quality and timing"""
+    fields = {column: summary[key] for key, column in SUMMARY_COLUMNS.items()}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO run_grades VALUES (?, ?, ?, ?, ?, ?)",
+            [(run_id, grade, stats["sum"], stats["min"], stats["max"], stats["count"])
+             for grade, stats in summary["grades"].items()]
+        )
+        update_run(conn, run_id, status='finished', finished_at=time.time(), eval_seconds=eval_seconds, **fields)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def latest_run(conn):
+    """Most recent finished run as a dict, or None"""
+    row = conn.execute(
+        "SELECT * FROM runs WHERE status = 'finished' ORDER BY run_id DESC LIMIT 1"
+    ).fetchone()
+    return dict(row) if row else None
+
+def list_runs(conn, status='finished'):
+    """All runs with the given status, oldest first"""
+    rows = conn.execute("SELECT * FROM runs WHERE status = ? ORDER BY run_id", (status,))
+    return [dict(row) for row in rows]
+
+def run_trends(conn, limit=500):
+    """
+    Summary metrics of the last `limit` finished runs that recorded them, oldest first:
+    (runs, grades) where runs are dicts with rating counts, mean_quality, match_rate and
+    safety_issues, and grades are dicts of per-run, per-grade mean/min/max quality
+    """
+    runs = conn.execute(
+        f"""
+        SELECT * FROM (
+            SELECT run_id, dataset, finished_at, row_count, excellent, good, needs_review, poor,
+                   safety_issues, matches, quality_sum / row_count AS mean_quality,
+                   CAST(matches AS REAL) / row_count AS match_rate
+            FROM runs {TREND_RUNS}
+        ) ORDER BY run_id
+        """,
+        (limit,)
+    ).fetchall()
+    if not runs:
+        return [], []
+    # Grades of exactly the runs selected above (not every later run, failed or unfinished ones included)
+    grades = conn.execute(
+        f"""
+        SELECT run_id, grade_level, quality_sum / row_count AS mean_quality,
+               quality_min AS min_quality, quality_max AS max_quality, row_count
+        FROM run_grades
+        WHERE run_id IN (SELECT run_id FROM runs {TREND_RUNS})
+        ORDER BY run_id, grade_level
+        """,
+        (limit,)
+    ).fetchall()
+    return [dict(row) for row in runs], [dict(row) for row in grades]
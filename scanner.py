@@ -0,0 +1,150 @@
+"""
+Multi-Pattern Scanner - Single-pass lexicon matching for response text
+Compiles every lexicon into one Aho-Corasick automaton so each response is walked once,
+no matter how many terms the lexicons hold
+"""
+
+def build_scanner(lexicons, whole_word_lexicons=()):
+    """
+    Compile a dict of {lexicon_name: [terms]} into a scanner
+    Terms are matched case-insensitively against lowercased text; lexicons named in
+    whole_word_lexicons only report hits that start and end on a word boundary
+    """
+    goto = [{}]
+    outputs = [[]]
+    patterns = []
+
+    for name, terms in lexicons.items():
+        whole_word = name in whole_word_lexicons
+        for term in terms:
+            term = term.lower()
+            if not term:
+                continue
+            state = 0
+            for ch in term:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(len(patterns))
+            patterns.append((name, term, whole_word))
+
+    # Breadth-first pass to wire failure links and merge outputs along them
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for ch, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and ch not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(ch, 0)
+            outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+    return {
+        "goto": goto,
+        "fail": fail,
+        "outputs": outputs,
+        "patterns": patterns,
+        "lexicons": list(lexicons),
+    }
+
+def _is_word_char(text, pos):
+    return 0 <= pos < len(text) and (text[pos].isalnum() or text[pos] == "_")
+
+def scan(scanner, text):
+    """
+    Walk lowercased text once and return every hit as (start, end, lexicon, term)
+    Offsets index into the text as passed in
+    """
+    goto = scanner["goto"]
+    fail = scanner["fail"]
+    outputs = scanner["outputs"]
+    patterns = scanner["patterns"]
+
+    hits = []
+    state = 0
+    for pos, ch in enumerate(text):
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        for pattern_id in outputs[state]:
+            name, term, whole_word = patterns[pattern_id]
+            start = pos + 1 - len(term)
+            if whole_word and (_is_word_char(text, start - 1) or _is_word_char(text, pos + 1)):
+                continue
+            hits.append((start, pos + 1, name, term))
+    return hits
+
+def lexicon_hits(scanner, text):
+    """Scan text and group the distinct terms found by lexicon name"""
+    found = {name: set() for name in scanner["lexicons"]}
+    for _, _, name, term in scan(scanner, text):
+        found[name].add(term)
+    return found
+
+def new_stream(scanner):
+    """
+    Matcher state for scanning text that arrives in chunks (see scan_chunk): the automaton
+    state, the text offset reached, and the last few characters for word-boundary checks
+    """
+    return {
+        "state": 0,
+        "offset": 0,
+        "tail": "",
+        # Whole-word hits ending at the last character seen, waiting on the next one
+        "pending": [],
+        "longest": max((len(term) for _, term, _ in scanner["patterns"]), default=0),
+    }
+
+def scan_chunk(scanner, stream, chunk):
+    """
+    Continue a stream with the next lowercased chunk of text and return the hits completed
+    so far, as scan() would report them on the whole text (offsets into the whole text)
+    Only the chunk and a tail as long as the longest term are walked, so each call costs
+    the same however much text came before it
+    """
+    goto = scanner["goto"]
+    fail = scanner["fail"]
+    outputs = scanner["outputs"]
+    patterns = scanner["patterns"]
+
+    if not chunk:
+        return []
+    # Boundary checks see the tail of earlier chunks plus this one
+    text = stream["tail"] + chunk
+    base = stream["offset"] - len(stream["tail"])
+    hits = [hit for hit in stream["pending"] if not _is_word_char(text, hit[1] - base)]
+    stream["pending"] = []
+
+    state = stream["state"]
+    for pos in range(len(stream["tail"]), len(text)):
+        ch = text[pos]
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        for pattern_id in outputs[state]:
+            name, term, whole_word = patterns[pattern_id]
+            hit = (base + pos + 1 - len(term), base + pos + 1, name, term)
+            if whole_word:
+                if _is_word_char(text, pos - len(term)):
+                    continue
+                if pos + 1 == len(text):
+                    stream["pending"].append(hit)
+                    continue
+                if _is_word_char(text, pos + 1):
+                    continue
+            hits.append(hit)
+
+    stream["state"] = state
+    stream["offset"] += len(chunk)
+    stream["tail"] = text[max(0, len(text) - stream["longest"]):]
+    return hits
+
+def finish_stream(stream):
+    """Hits still waiting on the character after them when the text ends (nothing follows them)"""
+    hits, stream["pending"] = stream["pending"], []
+    return hits
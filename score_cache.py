@@ -0,0 +1,180 @@
+"""
+Score Cache - Persistent memo of evaluation scores keyed by content
+Maps a 128-bit hash of (prompt, response, grade level, scorer version) to the scores a row got
+Entries are fixed-width records kept sorted by key in one .npz file, so a whole chunk is
+looked up with a single vectorized search; the file is capped at a number of entries with
+least-recently-used eviction, and a new scorer version (any rubric or scoring rule change)
+starts it empty
+"""
+
+import os
+from rubrics import describe_issue_codes
+from run_registry import RESULTS_DIR
+
+CACHE_PATH = os.path.join(RESULTS_DIR, 'score_cache.npz')
+DEFAULT_MAX_ENTRIES = 2_000_000
+
+# Cached per row - everything a results row has that doesn't depend on its expected rating
+# (Notes are rebuilt from Issue_Codes, so every entry has the same small size)
+SCORE_COLUMNS = ["Educational_Quality", "Overall_Rating", "Notes", "Issue_Codes"]
+RATING_LABELS = ["Excellent", "Good", "Needs Review", "Poor"]
+
+def _entry_dtype():
+    import numpy as np
+
+    return np.dtype([
+        ("key", "<u8"),
+        ("check_key", "<u8"),
+        ("quality", "<f8"),
+        ("rating", "u1"),
+        ("issue_codes", "<i8"),
+        ("last_used", "<i8"),
+    ])
+
+def open_cache(version, path=CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Load the score cache for a scorer version (empty if there is none, or it was
+    written by another version); returns the cache state passed to lookup_scores /
+    store_scores / close_cache
+    """
+    import numpy as np
+
+    entries, clock = np.empty(0, dtype=_entry_dtype()), 0
+    if os.path.exists(path):
+        with np.load(path) as saved:
+            if str(saved["version"]) == version:
+                entries, clock = saved["entries"], int(saved["clock"])
+    return {
+        "path": path,
+        "version": version,
+        "max_entries": max_entries,
+        "entries": entries,
+        # Entries stored since the last lookup, merged into the sorted entries before the next one
+        "pending": [],
+        # LRU clock: advances once per lookup, and carries on from the previous run
+        "clock": clock + 1,
+        "hits": 0,
+        "misses": 0,
+        "evicted": 0,
+    }
+
+def score_keys(cache, data):
+    """
+    Cache keys of a frame of prompt/response/grade_level rows: (key, check_key) arrays of
+    two independent 64-bit content hashes seeded with the scorer version
+    Hashed column-wise, so keying a row costs far less than scoring it
+    """
+    import pandas as pd
+
+    columns = data[["prompt", "response", "grade_level"]]
+    version = cache["version"]
+    key, check_key = (
+        pd.util.hash_pandas_object(columns, index=False, hash_key=seed, categorize=False).to_numpy()
+        for seed in (version[:16], version[16:32])
+    )
+    return key, check_key
+
+def _merge_pending(cache):
+    """Fold newly stored entries into the key-sorted entries (a newer entry replaces an older one)"""
+    import numpy as np
+
+    if not cache["pending"]:
+        return
+    new = np.concatenate(cache["pending"])
+    cache["pending"] = []
+    # Last entry per key wins
+    order = np.argsort(new["key"], kind="stable")
+    new = new[order]
+    last = np.append(new["key"][1:] != new["key"][:-1], True)
+    new = new[last]
+
+    entries = cache["entries"]
+    position = np.searchsorted(entries["key"], new["key"])
+    exists = position < len(entries)
+    exists[exists] = entries["key"][position[exists]] == new["key"][exists]
+    if exists.any():
+        entries = entries.copy()
+        entries[position[exists]] = new[exists]
+    cache["entries"] = np.insert(entries, position[~exists], new[~exists])
+
+def lookup_scores(cache, keys):
+    """
+    Look rows up by their score_keys; returns (hit, scores) - a boolean array marking
+    the rows found, and a SCORE_COLUMNS frame of their scores in row order
+    The entries found are marked as used now
+    """
+    import numpy as np
+    import pandas as pd
+
+    _merge_pending(cache)
+    key, check_key = keys
+    entries = cache["entries"]
+    position = np.searchsorted(entries["key"], key)
+    hit = position < len(entries)
+    hit[hit] = entries["key"][position[hit]] == key[hit]
+    # A row is a hit only when both hashes match the stored entry
+    hit[hit] = entries["check_key"][position[hit]] == check_key[hit]
+
+    found = entries[position[hit]]
+    if len(found):
+        if not entries.flags.writeable:
+            entries = cache["entries"] = entries.copy()
+        entries["last_used"][position[hit]] = cache["clock"]
+
+    codes, first = np.unique(found["issue_codes"], return_inverse=True)
+    notes = np.array(["; ".join(describe_issue_codes(int(code))) for code in codes], dtype=object)
+    scores = pd.DataFrame({
+        "Educational_Quality": found["quality"],
+        "Overall_Rating": np.array(RATING_LABELS, dtype=object)[found["rating"]],
+        "Notes": notes[first],
+        "Issue_Codes": found["issue_codes"],
+    })
+
+    hits = int(hit.sum())
+    cache["hits"] += hits
+    cache["misses"] += len(key) - hits
+    cache["clock"] += 1
+    return hit, scores
+
+def store_scores(cache, keys, scores):
+    """Remember the scores (a SCORE_COLUMNS frame) computed for the rows with these score_keys"""
+    import numpy as np
+    import pandas as pd
+
+    key, check_key = keys
+    new = np.empty(len(key), dtype=_entry_dtype())
+    new["key"] = key
+    new["check_key"] = check_key
+    new["quality"] = scores["Educational_Quality"].to_numpy()
+    new["rating"] = pd.Categorical(scores["Overall_Rating"], categories=RATING_LABELS).codes
+    new["issue_codes"] = scores["Issue_Codes"].to_numpy()
+    new["last_used"] = cache["clock"]
+    cache["pending"].append(new)
+
+def close_cache(cache):
+    """Evict least-recently-used entries past the size cap and save the cache"""
+    import numpy as np
+
+    _merge_pending(cache)
+    entries = cache["entries"]
+    excess = len(entries) - cache["max_entries"]
+    if excess > 0:
+        keep = np.sort(np.argsort(entries["last_used"], kind="stable")[excess:])
+        entries = entries[keep]
+        cache["evicted"] += excess
+
+    # Write a new file and swap it in, so a reader never sees a half-written cache
+    os.makedirs(os.path.dirname(cache["path"]) or '.', exist_ok=True)
+    temp_path = f'{cache["path"]}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        np.savez(f, entries=entries, version=np.array(cache["version"]), clock=np.array(cache["clock"]))
+    os.replace(temp_path, cache["path"])
+
+def cache_report(cache):
+    """One-line hit/miss summary for the end of a run"""
+    lookups = cache["hits"] + cache["misses"]
+    rate = cache["hits"] / lookups * 100 if lookups else 0.0
+    report = f"Score cache: {cache['hits']} hits, {cache['misses']} misses ({rate:.1f}% hit rate)"
+    if cache["evicted"]:
+        report += f", {cache['evicted']} evicted"
+    return report
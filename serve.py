@@ -0,0 +1,244 @@
+"""
+Scoring Service - asyncio HTTP service that scores chatbot responses in real time
+POST /score takes one {"prompt", "response", "grade_level"} item and POST /score/batch a
+list of them; both answer with evaluate_response's scores (safety, inappropriate language,
+topic accuracy, ...). The rubric index and lexicon scanner are built once at startup;
+concurrent requests are queued and scored together in small batches by one scoring task,
+and GET /metrics reports a latency histogram and throughput counters
+"""
+
+import argparse
+import asyncio
+import bisect
+import functools
+import json
+import time
+from evaluate import evaluate_response
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8780
+# Most responses scored in one batch before the queue is looked at again
+DEFAULT_MAX_BATCH = 64
+# Largest accepted request body and batch
+MAX_BODY_BYTES = 8 << 20
+MAX_BATCH_ITEMS = 1000
+# Repeated (prompt, response, grade level) items are answered from memory
+MEMO_SIZE = 65536
+# Upper bounds of the latency histogram buckets, in milliseconds (the last bucket is open-ended)
+LATENCY_BUCKETS_MS = [0.25, 0.5, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000]
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               500: "Internal Server Error"}
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def score_json(prompt, response, grade_level):
+    """evaluate_response's scores for one item, rendered as JSON once per distinct item"""
+    return json.dumps(evaluate_response(prompt, response, grade_level))
+
+def _item_key(item):
+    """(prompt, response, grade_level) of a request item; ValueError if it isn't one"""
+    if not isinstance(item, dict) or not isinstance(item.get("prompt"), str) or not isinstance(item.get("response"), str):
+        raise ValueError("each item needs a prompt and a response string (and a grade_level)")
+    return item["prompt"], item["response"], str(item.get("grade_level", ""))
+
+def new_metrics():
+    """Counters the service exposes at /metrics"""
+    return {
+        "started": time.time(),
+        "requests": 0,
+        "errors": 0,
+        "items": 0,
+        "batches": 0,
+        "scoring_seconds": 0.0,
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        "latency_sum_ms": 0.0,
+    }
+
+def record_latency(metrics, seconds):
+    milliseconds = seconds * 1000
+    metrics["latency_buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, milliseconds)] += 1
+    metrics["latency_sum_ms"] += milliseconds
+
+def histogram_percentile(buckets, q):
+    """Upper bound (ms) of the histogram bucket holding the q-th percentile request, or None"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q / 100 * total
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS + [float("inf")], buckets):
+        seen += count
+        if seen >= rank:
+            return bound
+    return float("inf")
+
+def metrics_report(metrics):
+    """The /metrics body: counters, rates since startup and the latency histogram"""
+    uptime = time.time() - metrics["started"]
+    requests = sum(metrics["latency_buckets"])
+    bounds = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+    return {
+        "uptime_seconds": round(uptime, 3),
+        "requests": metrics["requests"],
+        "errors": metrics["errors"],
+        "items_scored": metrics["items"],
+        "batches": metrics["batches"],
+        "mean_batch_items": round(metrics["items"] / metrics["batches"], 2) if metrics["batches"] else 0.0,
+        "requests_per_second": round(metrics["requests"] / uptime, 1) if uptime else 0.0,
+        "items_per_second": round(metrics["items"] / uptime, 1) if uptime else 0.0,
+        "scoring_seconds": round(metrics["scoring_seconds"], 3),
+        "latency_ms": {
+            "mean": round(metrics["latency_sum_ms"] / requests, 3) if requests else None,
+            **{f"p{q}": histogram_percentile(metrics["latency_buckets"], q) for q in (50, 90, 99)},
+            "histogram": dict(zip(bounds, metrics["latency_buckets"])),
+        },
+    }
+
+def new_service(max_batch=DEFAULT_MAX_BATCH):
+    """Service state: the queue of items waiting to be scored and the metrics"""
+    return {"queue": asyncio.Queue(), "max_batch": max_batch, "metrics": new_metrics()}
+
+async def batch_scorer(service):
+    """
+    Score queued items forever: take everything waiting (up to max_batch items), score it
+    in one pass without yielding to the event loop, then resolve each request's future
+    A request whose items fail to score gets the error instead, and the scorer carries on
+    """
+    queue, metrics = service["queue"], service["metrics"]
+    while True:
+        batch = [await queue.get()]
+        size = len(batch[0][0])
+        while size < service["max_batch"] and not queue.empty():
+            batch.append(queue.get_nowait())
+            size += len(batch[-1][0])
+        start = time.perf_counter()
+        for keys, future in batch:
+            # Skip requests that were cancelled (client gone) or otherwise already resolved
+            if future.done():
+                continue
+            try:
+                future.set_result([score_json(*key) for key in keys])
+            except Exception as error:
+                future.set_exception(error)
+        metrics["scoring_seconds"] += time.perf_counter() - start
+        metrics["batches"] += 1
+        metrics["items"] += size
+
+async def score_items(service, keys):
+    """Queue items for the batch scorer and wait for their scores (JSON strings)"""
+    future = asyncio.get_running_loop().create_future()
+    service["queue"].put_nowait((keys, future))
+    return await future
+
+async def handle_request(service, method, path, body):
+    """(status, JSON body bytes) for one request"""
+    path = path.split("?", 1)[0].rstrip("/") or "/"
+    if path == "/metrics" or path == "/health":
+        if method != "GET":
+            return 405, b'{"error": "use GET"}'
+        report = metrics_report(service["metrics"]) if path == "/metrics" else {"status": "ok"}
+        return 200, json.dumps(report).encode()
+    if path not in ("/score", "/score/batch"):
+        return 404, json.dumps({"error": f"no such endpoint: {path}"}).encode()
+    if method != "POST":
+        return 405, b'{"error": "use POST"}'
+
+    try:
+        request = json.loads(body)
+        if path == "/score":
+            keys = [_item_key(request)]
+        else:
+            items = request.get("items") if isinstance(request, dict) else request
+            if not isinstance(items, list):
+                raise ValueError('send a list of items, or {"items": [...]}')
+            if len(items) > MAX_BATCH_ITEMS:
+                raise ValueError(f"at most {MAX_BATCH_ITEMS} items per batch")
+            keys = [_item_key(item) for item in items]
+    except ValueError as error:
+        return 400, json.dumps({"error": str(error)}).encode()
+
+    try:
+        scores = await score_items(service, keys)
+    except Exception as error:
+        return 500, json.dumps({"error": f"scoring failed: {error}"}).encode()
+    if path == "/score":
+        return 200, scores[0].encode()
+    return 200, ('{"results": [' + ", ".join(scores) + "]}").encode()
+
+async def serve_connection(service, reader, writer):
+    """HTTP/1.1 with keep-alive: answer requests on one connection until the client closes it"""
+    metrics = service["metrics"]
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                return
+            start = time.perf_counter()
+            lines = head.decode("latin-1").split("\r\n")
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            try:
+                method, path, version = lines[0].split(" ", 2)
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                return
+            if length > MAX_BODY_BYTES:
+                status, body = 413, b'{"error": "request body too large"}'
+                keep_alive = False
+            else:
+                request_body = await reader.readexactly(length) if length else b""
+                status, body = await handle_request(service, method, path, request_body)
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            response_head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n")
+            if not keep_alive:
+                response_head += "Connection: close\r\n"
+            writer.write(response_head.encode() + b"\r\n" + body)
+            await writer.drain()
+            metrics["requests"] += 1
+            if status != 200:
+                metrics["errors"] += 1
+            record_latency(metrics, time.perf_counter() - start)
+            if not keep_alive:
+                return
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+    finally:
+        writer.close()
+
+async def start_service(host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=DEFAULT_MAX_BATCH):
+    """Start the service on the running event loop; returns (server, service state, scorer task)"""
+    # Build the scanner, rubric index and readability tables before the first request arrives
+    evaluate_response("Warm up the scorer", "Warming up the scorer before serving.", "5th")
+    service = new_service(max_batch)
+    scorer = asyncio.create_task(batch_scorer(service))
+    server = await asyncio.start_server(lambda reader, writer: serve_connection(service, reader, writer), host, port)
+    return server, service, scorer
+
+async def run_service(host, port, max_batch):
+    server, service, scorer = await start_service(host, port, max_batch)
+    address = server.sockets[0].getsockname()
+    print(f"Scoring service listening on http://{address[0]}:{address[1]} (Ctrl+C to stop)")
+    print("  POST /score, POST /score/batch, GET /metrics")
+    print(f"  python3 load_test.py --host {address[0]} --port {address[1]}")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP service scoring chatbot responses in real time")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help=f"most responses scored per batch before new requests are taken (default: {DEFAULT_MAX_BATCH})")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_service(args.host, args.port, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Shards - Evaluates one large input on several machines and merges the results
+split partitions the input by a hash of each row's content into N shard CSVs, every row
+keeping its place in the input as its Test_ID; run evaluates one shard (on any node) into
+its own results file plus a partial summary; merge combines the partial summaries into the
+rating counts, grade-level stats, evaluator accuracy and top issues that evaluating and
+analyzing the whole input on one machine reports
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from analyze_patterns import (
+    analyze_quality_patterns, generate_summary_report, load_summary, merge_summaries, prioritize_issues,
+)
+from evaluate import evaluate_file, merge_summary, new_summary, scorer_version, summary_lines
+from results_io import DATASET_COLUMNS, file_hash
+from run_registry import RESULTS_DIR
+from score_cache import DEFAULT_MAX_ENTRIES, cache_report, close_cache, open_cache
+
+SHARDS_DIR = os.path.join(RESULTS_DIR, 'shards')
+DEFAULT_SHARDS = 4
+# Input rows read per step while splitting
+DEFAULT_CHUNK_SIZE = 100000
+MANIFEST_VERSION = 1
+
+def shard_of(chunk, shards):
+    """
+    Shard index of each row: a hash of its prompt, grade level, response and expected
+    quality, taken as text so the same row lands in the same shard on every node and run
+    """
+    import pandas as pd
+
+    hashes = pd.util.hash_pandas_object(chunk[DATASET_COLUMNS].astype(str), index=False).to_numpy()
+    return hashes % shards
+
+def shard_path(out_dir, input_file, index, shards):
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(out_dir, f"{stem}_shard_{index + 1:03d}_of_{shards:03d}.csv")
+
+def manifest_path(out_dir, input_file):
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(out_dir, f"{stem}_shards.json")
+
+def partial_path(results_file):
+    """Where the partial summary of a shard's results file is saved"""
+    return f"{os.path.splitext(results_file)[0]}_partial.json"
+
+def _write_json(data, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+def split_input(input_file, shards, out_dir, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream the input into shard CSVs with an added test_id column (the row's 1-based place
+    in the input); writes and returns a manifest listing each shard's file, rows and SHA-256
+    """
+    import pandas as pd
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [shard_path(out_dir, input_file, index, shards) for index in range(shards)]
+    files = [open(path, "w", newline="", encoding="utf-8") for path in paths]
+    digests = [hashlib.sha256() for _ in range(shards)]
+    rows = [0] * shards
+    started = [False] * shards
+    next_test_id = 1
+    try:
+        # Rows are copied as read, so every shard holds the input's own text
+        for chunk in pd.read_csv(input_file, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            chunk["test_id"] = range(next_test_id, next_test_id + len(chunk))
+            next_test_id += len(chunk)
+            owners = shard_of(chunk, shards)
+            for index in range(shards):
+                part = chunk[owners == index]
+                if started[index] and not len(part):
+                    continue
+                text = part.to_csv(index=False, header=not started[index])
+                files[index].write(text)
+                digests[index].update(text.encode("utf-8"))
+                started[index] = True
+                rows[index] += len(part)
+    finally:
+        for f in files:
+            f.close()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "input": input_file,
+        "rows": next_test_id - 1,
+        "shards": [
+            {"file": os.path.basename(path), "rows": count, "sha256": digest.hexdigest()}
+            for path, count, digest in zip(paths, rows, digests)
+        ],
+    }
+    _write_json(manifest, manifest_path(out_dir, input_file))
+    return manifest
+
+def run_shard(shard_file, results_file, chunk_size=None, workers=1, cache=None):
+    """
+    Evaluate one shard CSV into results_file and save its partial summary next to it:
+    the evaluation counts and the analysis aggregates, tagged with the shard's SHA-256
+    Returns the partial summary
+    """
+    start = time.perf_counter()
+    evaluation = evaluate_file(shard_file, results_file, chunk_size, workers, cache=cache)
+    eval_seconds = time.perf_counter() - start
+    partial = {
+        "version": MANIFEST_VERSION,
+        "shard": os.path.basename(shard_file),
+        "sha256": file_hash(shard_file),
+        "results": results_file,
+        "eval_seconds": eval_seconds,
+        "evaluation": evaluation,
+        "analysis": load_summary(results_file),
+    }
+    _write_json(partial, partial_path(results_file))
+    return partial
+
+def merge_partials(manifest, partials):
+    """
+    (evaluation summary, analysis summary) of the whole input from one partial summary per
+    shard; ValueError unless the partials are exactly the manifest's shards, once each
+    Shards are matched by content, so shards with the same content (say, several empty
+    ones) take any of their partials, which are identical
+    """
+    by_hash = {}
+    for partial in partials:
+        if partial["version"] != MANIFEST_VERSION:
+            raise ValueError(f"{partial['shard']}: partial summary from another version of shards.py")
+        by_hash.setdefault(partial["sha256"], []).append(partial)
+
+    ordered = []
+    for shard in manifest["shards"]:
+        if not by_hash.get(shard["sha256"]):
+            raise ValueError(f"no partial summary for {shard['file']}")
+        partial = by_hash[shard["sha256"]].pop(0)
+        if partial["evaluation"]["total"] != shard["rows"]:
+            raise ValueError(f"{shard['file']}: {partial['evaluation']['total']} rows evaluated, {shard['rows']} in the shard")
+        ordered.append(partial)
+    hashes = {shard["sha256"] for shard in manifest["shards"]}
+    for sha256, extra in by_hash.items():
+        if extra and sha256 in hashes:
+            raise ValueError(f"{extra[0]['shard']}: more than one partial summary for this shard")
+    names = ", ".join(partial["shard"] for sha256, extra in by_hash.items() for partial in extra)
+    if names:
+        raise ValueError(f"not shards of {manifest['input']}: {names}")
+
+    evaluation = new_summary()
+    for partial in ordered:
+        merge_summary(evaluation, partial["evaluation"])
+    return evaluation, merge_summaries([partial["analysis"] for partial in ordered], shards=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a large input as shards on several machines and merge them")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split = commands.add_parser("split", help="partition an input CSV into shard CSVs by row hash")
+    split.add_argument("input", help="prompt/grade_level/response/expected_quality CSV to partition")
+    split.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help=f"number of shards (default: {DEFAULT_SHARDS})")
+    split.add_argument("--out-dir", default=SHARDS_DIR, help=f"directory for the shards and manifest (default: {SHARDS_DIR})")
+    split.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                       help=f"input rows read per step (default: {DEFAULT_CHUNK_SIZE})")
+
+    run = commands.add_parser("run", help="evaluate one shard into results plus a partial summary")
+    run.add_argument("shard", help="shard CSV written by split")
+    run.add_argument("--output", help="results file to write (default: <shard>_results.csv next to the shard)")
+    run.add_argument("--chunk-size", type=int, default=None,
+                     help="stream the shard in chunks of this many rows instead of loading it whole")
+    run.add_argument("--workers", type=int, default=1, help="score chunks in this many worker processes (0 = one per CPU)")
+    run.add_argument("--no-cache", action="store_true", help="score every row even if an earlier run already scored it")
+    run.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                     help=f"most rows kept in the score cache (default: {DEFAULT_MAX_ENTRIES})")
+
+    merge = commands.add_parser("merge", help="combine the shards' partial summaries into the whole input's report")
+    merge.add_argument("manifest", help="manifest JSON written by split")
+    merge.add_argument("partials", nargs="+", help="partial summary JSON of every shard")
+    merge.add_argument("--output", help="merged summary JSON to write (default: <input>_merged.json next to the manifest)")
+    args = parser.parse_args(argv)
+
+    if args.command == "split":
+        if args.shards < 1:
+            parser.error("--shards must be at least 1")
+        manifest = split_input(args.input, args.shards, args.out_dir, args.chunk_size)
+        print(f"✓ {manifest['rows']} rows split into {args.shards} shards in: {args.out_dir}")
+        for shard in manifest["shards"]:
+            print(f"  {shard['file']}: {shard['rows']} rows")
+        print(f"✓ Manifest saved to: {manifest_path(args.out_dir, args.input)}")
+        print(f"  Evaluate each shard with: python3 shards.py run <shard>")
+        return
+
+    if args.command == "run":
+        results_file = args.output or f"{os.path.splitext(args.shard)[0]}_results.csv"
+        cache = None if args.no_cache else open_cache(scorer_version(), max_entries=args.cache_size)
+        print(f"\n🧩 Evaluating shard: {args.shard}\n")
+        try:
+            partial = run_shard(args.shard, results_file, args.chunk_size, args.workers or os.cpu_count() or 1, cache)
+        finally:
+            if cache is not None:
+                close_cache(cache)
+        for line in summary_lines(partial["evaluation"]):
+            print(line)
+        if cache is not None:
+            print(cache_report(cache))
+        print(f"\n✓ Results saved to: {results_file}")
+        print(f"✓ Partial summary saved to: {partial_path(results_file)}")
+        return
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    partials = []
+    for path in args.partials:
+        with open(path) as f:
+            partials.append(json.load(f))
+    try:
+        evaluation, analysis = merge_partials(manifest, partials)
+    except ValueError as error:
+        raise SystemExit(f"❌ {error}")
+
+    print("=" * 60)
+    print(f"EVALUATION SUMMARY ({len(partials)} shards of {manifest['input']})")
+    print("=" * 60)
+    for line in summary_lines(evaluation):
+        print(line)
+    matches = evaluation["matches"]
+    print(f"\nEvaluator Quality: {matches}/{evaluation['total']} ({matches/max(evaluation['total'], 1)*100:.1f}%)\n")
+    analyze_quality_patterns(analysis)
+    prioritize_issues(analysis)
+    generate_summary_report(analysis, manifest["input"])
+
+    stem = os.path.splitext(os.path.basename(manifest["input"]))[0]
+    output = args.output or os.path.join(os.path.dirname(args.manifest), f"{stem}_merged.json")
+    _write_json({"input": manifest["input"], "shards": len(partials), "evaluation": evaluation, "analysis": analysis}, output)
+    print(f"\n✓ Merged summary saved to: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Stats Utilities - Small summary statistics shared by the reporting tools
+Kept free of heavy imports so the API client, load generator and guardrail can all use them
+"""
+
+import math
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (q from 0 to 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1]
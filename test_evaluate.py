@@ -0,0 +1,54 @@
+"""
+Equivalence tests - evaluate_batch must produce exactly the results rows the
+row-by-row evaluate_response loop produces, for every bundled test file
+Run with: python -m pytest
+"""
+
+import glob
+import os
+import pandas as pd
+import pytest
+from evaluate import evaluate_batch, evaluate_response
+
+PROMPT_FILES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts', '*.csv')))
+
+def result_rows(data):
+    """Results rows built one at a time from evaluate_response, as the original evaluator did"""
+    rows = []
+    for i, item in enumerate(data.to_dict('records'), 1):
+        eval_result = evaluate_response(item["prompt"], item["response"], item["grade_level"])
+        rows.append({
+            "Test_ID": i,
+            "Prompt": item["prompt"],
+            "Response": item["response"],
+            "Grade_Level": item["grade_level"],
+            "Expected_Quality": item["expected_quality"],
+            "Educational_Quality": round(eval_result["educational_quality"], 2),
+            "Overall_Rating": eval_result["overall_rating"],
+            "Matches_Expected": eval_result["overall_rating"].lower() == item["expected_quality"].lower(),
+            "Notes": "; ".join(eval_result["notes"]),
+            "Issue_Codes": eval_result["issue_codes"],
+        })
+    return rows
+
+def test_prompt_files_found():
+    assert PROMPT_FILES
+
+@pytest.mark.parametrize("csv_file", PROMPT_FILES, ids=os.path.basename)
+def test_evaluate_batch_matches_evaluate_response(csv_file):
+    data = pd.read_csv(csv_file)
+    expected = result_rows(data)
+    batch = evaluate_batch(data).to_dict('records')
+
+    assert len(batch) == len(expected)
+    for got, want in zip(batch, expected):
+        assert list(got) == list(want)
+        for column, value in want.items():
+            # Same value and same Python type family (no 1 vs True, no 0.9 vs "0.9")
+            assert got[column] == value, f"Test {want['Test_ID']} {column}: {got[column]!r} != {value!r}"
+            assert isinstance(got[column], str) == isinstance(value, str), f"Test {want['Test_ID']} {column}"
+
+def test_evaluate_batch_numbers_from_first_test_id():
+    data = pd.read_csv(PROMPT_FILES[0])
+    batch = evaluate_batch(data, first_test_id=101)
+    assert batch["Test_ID"].tolist() == list(range(101, 101 + len(data)))
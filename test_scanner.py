@@ -0,0 +1,59 @@
+"""
+Streaming scanner tests - feeding a text to scan_chunk in random pieces must report
+exactly the hits scan() reports on the whole text, whole-word lexicons included
+Run with: python -m pytest
+"""
+
+import glob
+import os
+import random
+import pandas as pd
+import pytest
+from rubrics import RESPONSE_SCANNER, SAFETY_SCANNER
+from scanner import build_scanner, finish_stream, new_stream, scan, scan_chunk
+
+PROMPT_FILES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts', '*.csv')))
+
+# Overlapping terms (one a prefix, suffix or infix of another) in a small alphabet, so
+# random text hits often and hits straddle chunk boundaries
+FUZZ_LEXICONS = {
+    "plain": ["ab", "abc", "bca", "c"],
+    "words": ["ab", "cab", "b a", "a"],
+}
+
+def stream_hits(scanner, text, rng, max_chunk=6):
+    """Hits of text fed to a stream in random chunks of 1 to max_chunk characters"""
+    stream = new_stream(scanner)
+    hits = []
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, max_chunk)
+        hits.extend(scan_chunk(scanner, stream, text[pos:pos + size]))
+        pos += size
+    # A whole-word hit held for the next character comes out after the other hits ending
+    # where it does, so hits are compared in order of position
+    return sorted(hits + finish_stream(stream))
+
+@pytest.mark.parametrize("whole_word", [(), ("words",)], ids=["substring", "whole-word"])
+def test_random_chunks_match_scan(whole_word):
+    scanner = build_scanner(FUZZ_LEXICONS, whole_word)
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choice("abc _.") for _ in range(rng.randint(0, 40)))
+        assert stream_hits(scanner, text, rng) == sorted(scan(scanner, text)), repr(text)
+
+@pytest.mark.parametrize("scanner", [RESPONSE_SCANNER, SAFETY_SCANNER], ids=["response", "safety"])
+def test_prompt_responses_match_scan(scanner):
+    rng = random.Random(1)
+    for csv_file in PROMPT_FILES:
+        for response in pd.read_csv(csv_file)["response"]:
+            text = response.lower()
+            assert stream_hits(scanner, text, rng) == sorted(scan(scanner, text)), text
+
+def test_empty_chunks_change_nothing():
+    scanner = build_scanner(FUZZ_LEXICONS, ("words",))
+    stream = new_stream(scanner)
+    hits = scan_chunk(scanner, stream, "cab")
+    hits += scan_chunk(scanner, stream, "")
+    hits += scan_chunk(scanner, stream, " ab")
+    assert sorted(hits + finish_stream(stream)) == sorted(scan(scanner, "cab ab"))
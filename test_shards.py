@@ -0,0 +1,59 @@
+"""
+Shard mode tests - splitting an input, evaluating every shard and merging the partial
+summaries must report what evaluating and analyzing the whole input at once reports,
+even when there are more shards than rows and some shards are empty
+Run with: python -m pytest
+"""
+
+import contextlib
+import io
+import json
+import os
+import pytest
+from analyze_patterns import analyze_quality_patterns, generate_summary_report, load_summary, prioritize_issues
+from evaluate import evaluate_file, summary_lines
+from shards import merge_partials, run_shard, split_input
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts')
+
+def report_text(summary):
+    """Everything the analyzer prints for a summary"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        analyze_quality_patterns(summary)
+        prioritize_issues(summary)
+        generate_summary_report(summary, 'input')
+    return output.getvalue()
+
+@pytest.mark.parametrize("dataset, shards", [("mixed_responses.csv", 40), ("test_prompts.csv", 3)])
+def test_merged_shards_match_single_run(tmp_path, monkeypatch, dataset, shards):
+    # Summary caches and shard outputs all go under the test's own directory
+    monkeypatch.chdir(tmp_path)
+    input_file = os.path.join(PROMPTS_DIR, dataset)
+    single = evaluate_file(input_file, 'single_results.csv')
+
+    manifest = split_input(input_file, shards, 'shards')
+    assert sum(shard["rows"] for shard in manifest["shards"]) == manifest["rows"] == single["total"]
+    if shards > manifest["rows"]:
+        assert any(shard["rows"] == 0 for shard in manifest["shards"])
+    partials = []
+    for shard in manifest["shards"]:
+        shard_file = os.path.join('shards', shard["file"])
+        partial = run_shard(shard_file, shard_file.replace('.csv', '_results.csv'))
+        # Partials go through JSON between machines
+        partials.append(json.loads(json.dumps(partial)))
+
+    evaluation, analysis = merge_partials(manifest, partials)
+    assert summary_lines(evaluation) == summary_lines(single)
+    assert evaluation["matches"] == single["matches"]
+    assert report_text(analysis) == report_text(load_summary('single_results.csv'))
+
+def test_empty_shard_writes_empty_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('empty.csv', 'w') as f:
+        f.write("prompt,grade_level,response,expected_quality,test_id\n")
+    partial = run_shard('empty.csv', 'empty_results.csv')
+    assert partial["evaluation"]["total"] == 0
+    assert partial["analysis"]["total"] == 0
+    with open('empty_results.csv') as f:
+        assert f.read().startswith("Test_ID,")
@@ -0,0 +1,363 @@
+"""
+Watch Mode - Tails a growing JSONL or CSV response log and evaluates it in micro-batches
+New records are read from a persisted byte offset and grouped into batches, each scored
+as soon as batch_size records are waiting or the oldest has waited max_wait seconds, then
+appended to one results CSV along with a line of rolling summary counts
+The offset, Test_ID counter and summary are saved after every batch, so a stopped
+watcher resumes exactly where it left off, without repeating or losing rows
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from evaluate import new_summary, score_chunks, scorer_version, update_summary
+from results_io import DATASET_COLUMNS, append_results, open_results
+from run_registry import RESULTS_DIR, allocate_run, connect_registry, finish_run, update_run
+from score_cache import DEFAULT_MAX_ENTRIES, cache_report, close_cache, open_cache
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_WAIT = 1.0
+DEFAULT_POLL_INTERVAL = 0.2
+# Most bytes taken from the input per read, so a large backlog is worked off in bounded bites
+READ_BYTES = 4 << 20
+# One state file per watched input, named after it
+WATCH_DIR = os.path.join(RESULTS_DIR, 'watch')
+REQUIRED_FIELDS = ("prompt", "response", "grade_level")
+
+def state_path(input_path):
+    """Where the watcher of an input file keeps its offset and counters"""
+    absolute = os.path.abspath(input_path)
+    digest = hashlib.sha1(absolute.encode()).hexdigest()[:8]
+    return os.path.join(WATCH_DIR, f"{os.path.basename(absolute)}_{digest}.json")
+
+def summary_log_path(results_filename):
+    """JSONL of rolling summary counts, one line per batch, next to the results file"""
+    return os.path.splitext(results_filename)[0] + "_summary.jsonl"
+
+def new_state(input_path, results_filename, run_id):
+    """Watch state for an input not read yet"""
+    return {
+        "input": os.path.abspath(input_path),
+        "results_path": results_filename,
+        "run_id": run_id,
+        # Input position: the file (by inode) and the byte after the last record evaluated
+        "inode": None,
+        "offset": 0,
+        "header": None,
+        "next_test_id": 1,
+        # Output sizes after the last batch; anything past them was written by a batch that never finished
+        "results_bytes": 0,
+        "summary_bytes": 0,
+        "skipped": 0,
+        "eval_seconds": 0.0,
+        "summary": new_summary(),
+    }
+
+def load_state(path):
+    """Saved watch state, or None for an input never watched"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(state, path):
+    """Replace the state file in one step, so a crash leaves the old state or the new one"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+def _truncate(path, size):
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+def recover_outputs(state):
+    """Cut the results and summary log back to the last saved batch, dropping rows a crash left half-recorded"""
+    _truncate(state["results_path"], state["results_bytes"])
+    _truncate(summary_log_path(state["results_path"]), state["summary_bytes"])
+
+def input_format(input_path):
+    return "csv" if input_path.lower().endswith(".csv") else "jsonl"
+
+def _to_row(record):
+    """A dataset row from a parsed record, or None if it lacks a prompt, response or grade level"""
+    if not isinstance(record, dict) or any(record.get(field) is None for field in REQUIRED_FIELDS):
+        return None
+    return [str(record.get(column) or "") for column in DATASET_COLUMNS]
+
+def _complete_records(data, fmt):
+    """
+    Split bytes read from the input into complete records: yields (raw bytes, end position)
+    Only lines ending in a newline are taken; a CSV record continues over line breaks
+    inside a quoted field, i.e. while its count of quote characters is odd
+    """
+    start = 0
+    record_start = 0
+    quotes = 0
+    while True:
+        end = data.find(b"\n", start)
+        if end < 0:
+            return
+        if fmt == "csv":
+            quotes += data.count(b'"', start, end)
+            start = end + 1
+            if quotes % 2:
+                continue
+            quotes = 0
+        else:
+            start = end + 1
+        yield data[record_start:start], start
+        record_start = start
+
+def read_records(f, offset, fmt, header):
+    """
+    Records after offset in an open binary input file
+    Returns ([(dataset row or None for a malformed record, end offset)], CSV header,
+    offset after everything read - records, blank lines and the header alike)
+    A record still being written (no newline yet) is left for the next read
+    """
+    f.seek(offset)
+    data = bytearray()
+    while True:
+        chunk = f.read(READ_BYTES)
+        data += chunk
+        complete = list(_complete_records(data, fmt))
+        # A record longer than one read: keep reading until it ends or the file does
+        if complete or len(chunk) < READ_BYTES:
+            break
+    records = []
+    consumed = offset
+    for raw, end in complete:
+        consumed = offset + end
+        text = raw.decode("utf-8", errors="replace")
+        if not text.strip():
+            continue
+        if fmt == "csv":
+            fields = next(csv.reader(io.StringIO(text)), [])
+            if header is None:
+                header = fields
+                continue
+            record = dict(zip(header, fields))
+        else:
+            try:
+                record = json.loads(text)
+            except ValueError:
+                record = None
+        records.append((_to_row(record), offset + end))
+    return records, header, consumed
+
+def _open_input(input_path, state):
+    """
+    Open the input for reading from the saved offset, starting over if the file was
+    replaced (log rotation) or truncated since
+    """
+    f = open(input_path, "rb")
+    stat = os.fstat(f.fileno())
+    if state["inode"] is not None and (stat.st_ino != state["inode"] or stat.st_size < state["offset"]):
+        print(f"⚠ {input_path} was replaced or truncated - reading it from the start")
+        state["offset"] = 0
+    if state["offset"] == 0:
+        state["header"] = None
+    state["inode"] = stat.st_ino
+    return f
+
+def _rotated(input_path, f, read_offset):
+    """Whether the path now names a different file than the one open, or the open one shrank"""
+    try:
+        stat = os.stat(input_path)
+    except FileNotFoundError:
+        return False
+    return stat.st_ino != os.fstat(f.fileno()).st_ino or stat.st_size < read_offset
+
+def rolling_counts(state):
+    """Running totals written to the summary log after each batch"""
+    summary = state["summary"]
+    total = summary["total"]
+    return {
+        "total": total,
+        **{rating: summary[rating] for rating in ("Excellent", "Good", "Needs Review", "Poor")},
+        "safety_issues": summary["safety_issues"],
+        "matches": summary["matches"],
+        "mean_quality": round(summary["quality_sum"] / total, 4) if total else None,
+        "skipped": state["skipped"],
+    }
+
+def evaluate_batch_records(state, state_file, writer, batch, cache=None):
+    """
+    Score one micro-batch of (row, end offset, read time) records, append its results and
+    a summary line, then save the state; returns the summary line
+    """
+    import pandas as pd
+
+    rows = [row for row, _, _ in batch if row is not None]
+    start = time.perf_counter()
+    if rows:
+        data = pd.DataFrame(rows, columns=DATASET_COLUMNS)
+        results = next(score_chunks([data], cache=cache, first_test_id=state["next_test_id"]))
+        append_results(writer, results)
+        update_summary(state["summary"], results)
+        state["next_test_id"] += len(results)
+        state["results_bytes"] = os.path.getsize(state["results_path"])
+    state["eval_seconds"] += time.perf_counter() - start
+    state["skipped"] += len(batch) - len(rows)
+    state["offset"] = batch[-1][1]
+
+    # Lag: from the moment the batch's oldest record was read to its results being written
+    line = {"time": round(time.time(), 3), "rows": len(rows),
+            "lag_seconds": round(time.monotonic() - batch[0][2], 3), **rolling_counts(state)}
+    summary_log = summary_log_path(state["results_path"])
+    with open(summary_log, "a") as f:
+        f.write(json.dumps(line) + "\n")
+    state["summary_bytes"] = os.path.getsize(summary_log)
+    save_state(state, state_file)
+    return line
+
+def watch(input_path, state, state_file, batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT,
+          poll_interval=DEFAULT_POLL_INTERVAL, cache=None, idle_exit=None, on_batch=None):
+    """
+    Tail input_path from the saved state, evaluating new records in micro-batches until
+    interrupted (or, with idle_exit, until nothing new has arrived for that many seconds)
+    on_batch is called with each batch's summary line
+    """
+    fmt = input_format(input_path)
+    recover_outputs(state)
+    writer = open_results(state["results_path"])
+    # Continue the results CSV after the rows earlier sessions wrote
+    writer["rows"] = state["next_test_id"] - 1
+    f = _open_input(input_path, state)
+    read_offset = state["offset"]
+    pending = []
+    idle_since = time.monotonic()
+    def evaluate_pending(count):
+        nonlocal pending
+        line = evaluate_batch_records(state, state_file, writer, pending[:count], cache)
+        pending = pending[count:]
+        if on_batch:
+            on_batch(line)
+
+    try:
+        while True:
+            records, state["header"], read_offset = read_records(f, read_offset, fmt, state["header"])
+            now = time.monotonic()
+            if records:
+                pending.extend((row, end, now) for row, end in records)
+                idle_since = now
+
+            # Full batches go at once; a partial one waits up to max_wait for company
+            while len(pending) >= batch_size or (pending and now - pending[0][2] >= max_wait):
+                evaluate_pending(batch_size)
+                now = time.monotonic()
+            if records:
+                continue
+
+            # Caught up with the open file: if the log was rotated, finish what was read
+            # from the old file and carry on with the new one
+            if _rotated(input_path, f, read_offset):
+                while pending:
+                    evaluate_pending(batch_size)
+                f.close()
+                f = _open_input(input_path, state)
+                read_offset = state["offset"]
+                continue
+
+            if idle_exit is not None and not pending and now - idle_since >= idle_exit:
+                return state
+            wait = poll_interval
+            if pending:
+                wait = min(wait, max(0.0, max_wait - (now - pending[0][2])))
+            time.sleep(wait)
+    finally:
+        f.close()
+
+def _print_batch(line):
+    print(f"✓ {line['rows']} rows (lag {line['lag_seconds']:.2f}s) | total {line['total']}: "
+          f"Excellent {line['Excellent']}, Good {line['Good']}, Needs Review {line['Needs Review']}, "
+          f"Poor {line['Poor']}, safety issues {line['safety_issues']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tail a JSONL or CSV response log and evaluate new records continuously")
+    parser.add_argument("input", help="JSONL or CSV log with prompt, grade_level and response (and optionally expected_quality)")
+    parser.add_argument("--output", help="results CSV to append to (default: next results/results_N.csv; fixed once watching starts)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"evaluate as soon as this many new records are waiting (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT,
+                        help=f"longest a record waits for its batch to fill, in seconds (default: {DEFAULT_MAX_WAIT})")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"seconds between checks for new records when idle (default: {DEFAULT_POLL_INTERVAL})")
+    parser.add_argument("--from-end", action="store_true",
+                        help="on the first run, skip records already in the file and evaluate only new ones")
+    parser.add_argument("--idle-exit", type=float, default=None,
+                        help="stop once no new record has arrived for this many seconds (default: watch until interrupted)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="score every record even if an earlier run already scored the same content")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f"most rows kept in the score cache (default: {DEFAULT_MAX_ENTRIES})")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.output and not args.output.lower().endswith(".csv"):
+        parser.error("watch mode appends to a CSV results file")
+    if not os.path.exists(args.input):
+        parser.error(f"no such file: {args.input}")
+
+    registry = connect_registry()
+    state_file = state_path(args.input)
+    state = load_state(state_file)
+    if state is None:
+        run_id, results_filename = allocate_run(registry, args.input, args.output, ".csv")
+        state = new_state(args.input, results_filename, run_id)
+        if args.from_end:
+            with open(args.input, "rb") as f:
+                state["inode"] = os.fstat(f.fileno()).st_ino
+                if input_format(args.input) == "csv":
+                    state["header"] = next(csv.reader(io.TextIOWrapper(f, encoding="utf-8", newline="")), None)
+                state["offset"] = os.path.getsize(args.input)
+        save_state(state, state_file)
+    elif args.output and os.path.abspath(args.output) != os.path.abspath(state["results_path"]):
+        parser.error(f"{args.input} is already watched into {state['results_path']} (state: {state_file})")
+    else:
+        update_run(registry, state["run_id"], status='running')
+
+    print("=" * 60)
+    print("LLM RESPONSE QUALITY EVALUATOR - WATCH MODE")
+    print("=" * 60)
+    print(f"Watching: {args.input} (from byte {state['offset']}, {state['summary']['total']} rows evaluated so far)")
+    print(f"Results: {state['results_path']}")
+    print(f"Batches of up to {args.batch_size} records, at most {args.max_wait:g}s apart - Ctrl-C to stop\n")
+
+    cache = None if args.no_cache else open_cache(scorer_version(), max_entries=args.cache_size)
+    try:
+        watch(args.input, state, state_file, args.batch_size, args.max_wait, args.poll_interval,
+              cache, args.idle_exit, _print_batch)
+    except KeyboardInterrupt:
+        # Ctrl-C is how watching normally ends: record the last batch saved, where the next session resumes
+        state = load_state(state_file)
+        print("\n⚠ Stopped - run the same command again to continue from here")
+    except BaseException:
+        update_run(registry, state["run_id"], status='failed')
+        raise
+    finally:
+        if cache is not None:
+            close_cache(cache)
+    finish_run(registry, state["run_id"], state["summary"], state["eval_seconds"])
+
+    summary = state["summary"]
+    print("\n" + "=" * 60)
+    print("WATCH SUMMARY")
+    print("=" * 60)
+    for name, value in rolling_counts(state).items():
+        print(f"{name.replace('_', ' ').capitalize()}: {value}")
+    print(f"\nDetailed results saved to: {state['results_path']}")
+    print(f"Rolling summary log: {summary_log_path(state['results_path'])}")
+    if cache is not None:
+        print(cache_report(cache))
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()